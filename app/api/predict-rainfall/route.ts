@@ -20,13 +20,16 @@ export async function POST(request: Request) {
     console.log("Sending prediction request to:", apiUrl)
 
     // Add a timeout to the fetch request
+    const timeoutMs = 15000 // 15 second timeout for predictions
     const controller = new AbortController()
-    const timeoutId = setTimeout(() => controller.abort(), 15000) // 15 second timeout for predictions
+    const timeoutId = setTimeout(() => controller.abort(), timeoutMs)
 
     const response = await fetch(apiUrl, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
+        // Lets the backend shed the request early if it cannot answer in time
+        "X-Request-Timeout-Ms": String(timeoutMs),
       },
       body: JSON.stringify(transformedData),
       signal: controller.signal,
@@ -48,6 +51,16 @@ export async function POST(request: Request) {
       }
 
       console.error(`FastAPI error (${response.status}):`, errorText)
+
+      // The backend is overloaded; pass the status and Retry-After through so clients can back off
+      if (response.status === 429 || response.status === 503) {
+        const retryAfter = response.headers.get("Retry-After")
+        return NextResponse.json(
+          { error: "The prediction service is busy. Please try again shortly.", details: errorText },
+          { status: response.status, headers: retryAfter ? { "Retry-After": retryAfter } : undefined },
+        )
+      }
+
       throw new Error(`FastAPI responded with status: ${response.status}. Details: ${errorText}`)
     }
 
@@ -0,0 +1,150 @@
+"""
+Throughput benchmark for the production launcher.
+
+Starts `app.serve` with 1, 2, ... N workers, drives `/predict` with a fixed
+number of keep-alive client processes and prints a table of requests per
+second and latency percentiles for each worker count.
+
+Usage:
+    python -m app.bench --max-workers 4 --clients 32 --duration 15
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import signal
+import subprocess
+import sys
+import time
+
+PAYLOAD = json.dumps({
+    "YEAR": 2023,
+    "JUN": 150.5,
+    "MONSOON": 1,
+    "SUBDIVISION_KERALA": 1,
+    "RainToday": 1
+})
+
+
+def wait_until_healthy(port, timeout=120):
+    """Poll /health until the server answers or the timeout expires"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return True
+        except OSError:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def client(args):
+    """Send requests on one keep-alive connection until the deadline"""
+    port, deadline = args
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/json"}
+    latencies = []
+    errors = 0
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/predict", body=PAYLOAD, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return latencies, errors
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_level(workers, args):
+    """Benchmark a server running with the given number of workers"""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--port", str(args.port),
+         "--host", "127.0.0.1", "--limit-concurrency", "0"],
+        stdout=subprocess.DEVNULL if not args.verbose else None,
+        stderr=subprocess.DEVNULL if not args.verbose else None,
+    )
+    try:
+        if not wait_until_healthy(args.port):
+            raise RuntimeError(f"Server with {workers} workers did not become healthy")
+
+        # Warm up every worker before measuring
+        warmup_deadline = time.time() + args.warmup
+        with multiprocessing.Pool(args.clients) as pool:
+            pool.map(client, [(args.port, warmup_deadline)] * args.clients)
+
+        deadline = time.time() + args.duration
+        with multiprocessing.Pool(args.clients) as pool:
+            results = pool.map(client, [(args.port, deadline)] * args.clients)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    latencies = sorted(lat for lats, _ in results for lat in lats)
+    errors = sum(err for _, err in results)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / args.duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure /predict throughput from 1 to N workers")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent keep-alive client connections")
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds per worker count")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured warm-up seconds per worker count")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--verbose", action="store_true", help="Show server output")
+    args = parser.parse_args(argv)
+
+    cpus = os.cpu_count() or 1
+    if args.max_workers > cpus:
+        print(f"Only {cpus} CPUs available; worker counts above that measure contention, not scaling",
+              file=sys.stderr)
+
+    rows = []
+    for workers in range(1, args.max_workers + 1):
+        row = run_level(workers, args)
+        rows.append(row)
+        print(f"workers={workers}: {row['rps']:.1f} req/s", file=sys.stderr)
+
+    baseline = rows[0]["rps"] or 1.0
+    # Describe the host so the table can be pasted into the README as is
+    print(f"{cpus} CPUs ({platform.processor() or platform.machine()}), {platform.system()}, "
+          f"Python {platform.python_version()}, --clients {args.clients} --duration {args.duration:g}")
+    print()
+    print("| workers | req/s | speedup | p50 (ms) | p99 (ms) | errors |")
+    print("|--------:|------:|--------:|---------:|---------:|-------:|")
+    for row in rows:
+        print(f"| {row['workers']} | {row['rps']:.1f} | {row['rps'] / baseline:.2f}x "
+              f"| {row['p50_ms']:.1f} | {row['p99_ms']:.1f} | {row['errors']} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Cold-start report for the API process.
+
+Each run starts a fresh interpreter and times the phases a new worker goes
+through: importing app.main, loading the model, loading the dataset
+aggregates, and serving the first /predict request. The command exits
+with status 1 when the median total exceeds --budget-ms (default 4000, or
+COLDSTART_BUDGET_MS), so it can run as a CI check as is.
+
+Usage:
+    python -m app.coldstart --runs 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PHASES = ["import", "model_load", "dataset_load", "first_request"]
+
+FIRST_REQUEST = json.dumps({
+    "YEAR": 2023,
+    "JUN": 150.5,
+    "MONSOON": 1,
+    "SUBDIVISION_KERALA": 1,
+    "RainToday": 1
+}).encode()
+
+
+async def _asgi_request(app, method, path, body):
+    """Send one HTTP request straight to an ASGI app and return the status code"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = {}
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status.get("code")
+
+
+def measure():
+    """Time each startup phase in this (fresh) interpreter"""
+    timings = {}
+
+    start = time.perf_counter()
+    from app.main import app, ml_service, rainfall_aggregates
+    timings["import"] = time.perf_counter() - start
+
+    # load_model would quietly train and save a model when there is no
+    # artifact, which is not a cold start worth timing
+    if not os.path.exists(ml_service.model_path):
+        raise FileNotFoundError(f"No model artifact at {ml_service.model_path}")
+    start = time.perf_counter()
+    ml_service.load_artifact()
+    timings["model_load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rainfall_aggregates.refresh()
+    timings["dataset_load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    status = asyncio.run(_asgi_request(app, "POST", "/predict", FIRST_REQUEST))
+    timings["first_request"] = time.perf_counter() - start
+    if status != 200:
+        raise RuntimeError(f"First /predict request returned status {status}")
+
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure API cold-start time and enforce a budget")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to measure")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("COLDSTART_BUDGET_MS", 4000)),
+                        help="Fail if the median total exceeds this (default: 4000)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        # Keep stdout for the result; the app's own logging goes to stderr
+        stdout = sys.stdout
+        sys.stdout = sys.stderr
+        timings = measure()
+        stdout.write(json.dumps(timings) + "\n")
+        return 0
+
+    runs = []
+    for _ in range(args.runs):
+        result = subprocess.run([sys.executable, "-m", "app.coldstart", "--child"],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        if result.returncode != 0:
+            print("Cold-start measurement failed; rerun with `python -m app.coldstart --child` for details")
+            return 2
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    report = {phase: statistics.median(run[phase] for run in runs) * 1000 for phase in PHASES}
+    report["total"] = statistics.median(sum(run[phase] for phase in PHASES) for run in runs) * 1000
+    within_budget = report["total"] <= args.budget_ms
+
+    if args.json:
+        print(json.dumps({"median_ms": report, "runs": len(runs), "budget_ms": args.budget_ms,
+                          "within_budget": within_budget}))
+    else:
+        print(f"Cold start (median of {len(runs)} runs):")
+        for phase in PHASES + ["total"]:
+            print(f"  {phase:14} {report[phase]:8.1f} ms")
+        print(f"Budget {args.budget_ms:.0f} ms: {'OK' if within_budget else 'EXCEEDED'}")
+
+    return 0 if within_budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
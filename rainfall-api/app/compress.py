@@ -0,0 +1,192 @@
+"""
+Latency-budgeted compression of the serving random forest.
+
+Searches tree count, max depth and minimum leaf size (plus truncations of
+the currently deployed forest), measures single-row p99 latency, artifact
+size, accuracy and F1 on the held-out split used by train_model, prints
+the Pareto frontier and saves the smallest artifact that meets the budget.
+
+Usage:
+    python -m app.compress --p99-ms 5 --max-drop 0.01
+"""
+import argparse
+import copy
+import io
+import itertools
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score
+
+from app.services.ml_model import MLModelService
+from app.utils.data import load_dataset
+
+
+def truncate_forest(forest, n_trees):
+    """Return a shallow copy of a fitted forest that only uses its first n_trees trees"""
+    truncated = copy.copy(forest)
+    truncated.estimators_ = forest.estimators_[:n_trees]
+    truncated.n_estimators = n_trees
+    return truncated
+
+
+def artifact_size(model):
+    """Size in bytes of the model as joblib.dump writes it"""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell()
+
+
+def measure_p99_ms(model, X, samples, warmup=20):
+    """p99 latency of single-row predict_proba calls, matching the /predict path"""
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, X.shape[0], size=samples + warmup)
+    timings = []
+    for i, row in enumerate(rows):
+        features = X[row:row + 1]
+        start = time.perf_counter()
+        model.predict_proba(features)
+        if i >= warmup:
+            timings.append(time.perf_counter() - start)
+    return float(np.percentile(timings, 99) * 1000)
+
+
+def evaluate(name, params, model, X_test, y_test, samples):
+    y_pred = model.predict(X_test)
+    return {
+        "name": name,
+        "params": params,
+        "model": model,
+        "accuracy": float(accuracy_score(y_test, y_pred)),
+        "f1": float(f1_score(y_test, y_pred, zero_division=0)),
+        "p99_ms": measure_p99_ms(model, X_test, samples),
+        "size_bytes": artifact_size(model),
+    }
+
+
+def pareto_frontier(candidates):
+    """Candidates not dominated on (p99 latency, artifact size, F1)"""
+    frontier = []
+    for c in candidates:
+        dominated = any(
+            o["p99_ms"] <= c["p99_ms"] and o["size_bytes"] <= c["size_bytes"] and o["f1"] >= c["f1"]
+            and (o["p99_ms"] < c["p99_ms"] or o["size_bytes"] < c["size_bytes"] or o["f1"] > c["f1"])
+            for o in candidates
+        )
+        if not dominated:
+            frontier.append(c)
+    return sorted(frontier, key=lambda c: c["size_bytes"])
+
+
+def parse_list(value, cast=int):
+    return [None if item == "none" else cast(item) for item in value.split(",")]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find the smallest forest that fits a latency and accuracy budget")
+    parser.add_argument("--p99-ms", type=float, required=True, help="Target p99 single-row inference latency (ms)")
+    parser.add_argument("--max-drop", type=float, default=0.01,
+                        help="Maximum allowed drop in accuracy and F1 versus the baseline (absolute)")
+    parser.add_argument("--trees", default="5,10,25,50,100", help="Tree counts to try")
+    parser.add_argument("--depths", default="none,16,12,8,6", help="Max depths to try ('none' for unbounded)")
+    parser.add_argument("--leaves", default="1,2,5,10", help="Minimum samples per leaf to try")
+    parser.add_argument("--latency-samples", type=int, default=300, help="Timed predictions per candidate")
+    parser.add_argument("--model", default=None, help="Baseline artifact (default: the serving model)")
+    parser.add_argument("--output", default="./models/rainfall_pipeline_model.compressed.joblib",
+                        help="Where to write the selected artifact")
+    parser.add_argument("--report", default=None, help="Optional JSON file for the full search report")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    trees = sorted(parse_list(args.trees))
+    depths = parse_list(args.depths)
+    leaves = parse_list(args.leaves)
+
+    service = MLModelService(model_path=args.model)
+    service.dataset = load_dataset()
+    if service.dataset is None or service.dataset.empty:
+        raise SystemExit("Failed to load dataset or dataset is empty")
+    service.regional_stats = service._calculate_regional_stats(service.dataset)
+    X_train, X_test, y_train, y_test = service.prepare_training_data()
+
+    # Baseline: the deployed forest if there is one, otherwise the forest train_model would build
+    if os.path.exists(service.model_path):
+        baseline_model = joblib.load(service.model_path)["model"]
+        print(f"Baseline: {service.model_path}")
+    else:
+        baseline_model = RandomForestClassifier(n_estimators=100, random_state=42).fit(X_train, y_train)
+        print("Baseline: newly trained 100-tree forest")
+    baseline = evaluate("baseline", {"n_estimators": len(baseline_model.estimators_)},
+                        baseline_model, X_test, y_test, args.latency_samples)
+
+    candidates = [baseline]
+    # Trees are independent, so forests with fewer trees are prefixes of the
+    # largest forest fitted for each depth/leaf combination
+    for n_trees in trees:
+        if n_trees < len(baseline_model.estimators_):
+            candidates.append(evaluate(f"baseline[:{n_trees}]", {"n_estimators": n_trees},
+                                       truncate_forest(baseline_model, n_trees), X_test, y_test, args.latency_samples))
+    for max_depth, min_samples_leaf in itertools.product(depths, leaves):
+        forest = RandomForestClassifier(n_estimators=trees[-1], max_depth=max_depth,
+                                        min_samples_leaf=min_samples_leaf, random_state=42)
+        forest.fit(X_train, y_train)
+        for n_trees in trees:
+            params = {"n_estimators": n_trees, "max_depth": max_depth, "min_samples_leaf": min_samples_leaf}
+            candidates.append(evaluate(f"rf(n={n_trees}, depth={max_depth}, leaf={min_samples_leaf})", params,
+                                       truncate_forest(forest, n_trees), X_test, y_test, args.latency_samples))
+        print(f"Searched max_depth={max_depth}, min_samples_leaf={min_samples_leaf}")
+
+    for c in candidates:
+        c["fits"] = (c["p99_ms"] <= args.p99_ms
+                     and baseline["accuracy"] - c["accuracy"] <= args.max_drop
+                     and baseline["f1"] - c["f1"] <= args.max_drop)
+
+    frontier = pareto_frontier(candidates)
+    print(f"\nBaseline: accuracy={baseline['accuracy']:.4f} f1={baseline['f1']:.4f} "
+          f"p99={baseline['p99_ms']:.2f}ms size={baseline['size_bytes'] / 1024:.0f}KiB")
+    print("Pareto frontier (p99 latency, artifact size, F1):")
+    print(f"{'candidate':45} {'p99 ms':>8} {'KiB':>8} {'acc':>7} {'f1':>7}  fits")
+    for c in frontier:
+        print(f"{c['name']:45} {c['p99_ms']:8.2f} {c['size_bytes'] / 1024:8.0f} "
+              f"{c['accuracy']:7.4f} {c['f1']:7.4f}  {'yes' if c['fits'] else 'no'}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({
+                "budget": {"p99_ms": args.p99_ms, "max_drop": args.max_drop},
+                "candidates": [{k: v for k, v in c.items() if k != "model"} for c in candidates],
+                "frontier": [c["name"] for c in frontier],
+            }, f, indent=2)
+        print(f"Report written to {args.report}")
+
+    fitting = [c for c in candidates if c["fits"]]
+    if not fitting:
+        print(f"\nNo candidate meets p99 <= {args.p99_ms}ms with at most {args.max_drop} drop in accuracy/F1")
+        return 1
+
+    best = min(fitting, key=lambda c: (c["size_bytes"], c["p99_ms"]))
+    print(f"\nSelected {best['name']}: p99={best['p99_ms']:.2f}ms size={best['size_bytes'] / 1024:.0f}KiB "
+          f"accuracy={best['accuracy']:.4f} f1={best['f1']:.4f}")
+
+    service.model = best["model"]
+    service.feature_importances = dict(zip(service.feature_columns, service.model.feature_importances_))
+    service.save_model(args.output, compression={
+        "params": best["params"],
+        "accuracy": best["accuracy"],
+        "f1": best["f1"],
+        "p99_ms": best["p99_ms"],
+        "baseline": {k: baseline[k] for k in ("accuracy", "f1", "p99_ms", "size_bytes")},
+    })
+    print(f"Serve it with RAINFALL_MODEL_PATH={args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Append new rainfall observations to the observation store.
+
+Running API workers fold the appended rows into their aggregates on the
+next /stats or /regional-data request, without re-reading the full dataset.
+
+Usage:
+    python -m app.ingest new_observations.csv
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from app.services.aggregates import get_ingest_store
+from app.utils.data import find_dataset_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append observations to the rainfall observation store")
+    parser.add_argument("input", help="CSV or NDJSON file with rows in rain_predictions1.csv format")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows appended per write")
+    args = parser.parse_args(argv)
+
+    store = get_ingest_store()
+    if not store.exists():
+        # New stores use the base dataset's columns as their header
+        dataset_path = find_dataset_path()
+        if dataset_path is not None:
+            store.default_columns = pd.read_csv(dataset_path, nrows=0).columns.tolist()
+
+    if args.input.endswith((".ndjson", ".jsonl")):
+        chunks = pd.read_json(args.input, lines=True, chunksize=args.chunk_size)
+    else:
+        chunks = pd.read_csv(args.input, chunksize=args.chunk_size)
+
+    total = 0
+    for chunk in chunks:
+        if "YEAR" not in chunk.columns or chunk["YEAR"].isna().any():
+            raise SystemExit(f"Every row must have a YEAR (failed after {total} rows)")
+        try:
+            total += store.append(chunk)
+        except ValueError as e:
+            raise SystemExit(f"{e} (failed after {total} rows)")
+
+    print(f"Appended {total} rows to {store.path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
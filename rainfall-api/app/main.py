@@ -1,11 +1,35 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import uvicorn
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+import hmac
+import pandas as pd
 import os
+import time
 from app.models.prediction import PredictionInput, PredictionOutput
 from app.services.ml_model import MLModelService
-from app.utils.data import get_rainfall_statistics, get_regional_data
+from app.services.aggregates import RainfallAggregates, get_ingest_store
+from app.services.profiler import ProfilingMiddleware, RequestProfiler
+from app.services.admission import AdmissionController, AdmissionMiddleware
+from app.services.drift import DriftMonitor
+from app.utils.shared_tables import get_shared_tables
+from app.utils.singleflight import SingleFlight
+from app.utils.bulk import (
+    detect_format, spool_body, iter_file, iter_record_chunks, format_predictions, format_summary
+)
+
+# Rows scored per batch by the bulk endpoint
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", 1000))
+BULK_MAX_CHUNK_ROWS = 10000
+
+# Admission control for /predict: concurrent requests, queued requests and
+# the deadline applied when a caller sends no X-Request-Timeout-Ms header
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", 8))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 64))
+ADMISSION_DEFAULT_TIMEOUT_MS = float(os.getenv("ADMISSION_DEFAULT_TIMEOUT_MS", 15000))
+if ADMISSION_MAX_CONCURRENCY < 1:
+    raise ValueError("ADMISSION_MAX_CONCURRENCY must be at least 1")
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -14,6 +38,13 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Sheds /predict load early (429/503) instead of letting requests time out in a
+# queue; added before CORS so that rejections still carry CORS headers
+admission = AdmissionController(
+    ADMISSION_MAX_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_DEFAULT_TIMEOUT_MS / 1000
+)
+app.add_middleware(AdmissionMiddleware, controller=admission, paths=["/predict"])
+
 # Add CORS middleware to allow requests from your Next.js frontend
 app.add_middleware(
     CORSMiddleware,
@@ -23,13 +54,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# On-demand request profiling; inactive (and free) until an admin starts a session
+profiler = RequestProfiler()
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
 # Initialize ML model service
 ml_service = MLModelService()
 
+# Running aggregates over the dataset and ingested observations, attached to
+# tables shared across workers when RAINFALL_SHARED_TABLES_PATH is set
+rainfall_aggregates = RainfallAggregates(get_ingest_store(), get_shared_tables())
+
+# Collapses concurrent identical /stats and /regional-data requests
+single_flight = SingleFlight()
+
+# Compares live /predict inputs with the training data, off the request path
+drift_monitor = DriftMonitor()
+
 @app.on_event("startup")
 async def startup_event():
     """Load the ML model on startup"""
-    ml_service.load_model()
+    # Workers started by app.serve inherit a preloaded model from the parent
+    if ml_service.model is None:
+        start = time.perf_counter()
+        ml_service.load_model()
+        print(f"Model loaded in {time.perf_counter() - start:.2f}s")
+    drift_monitor.set_reference(ml_service.drift_reference)
 
 @app.get("/")
 def read_root():
@@ -62,23 +112,21 @@ def predict_rainfall(input_data: PredictionInput):
         
         # Make prediction
         prediction = ml_service.predict(features)
+        drift_monitor.observe(input_data)
         
         # Get regional information
         regional_info = None
         for key, value in input_data.dict().items():
             if key.startswith('SUBDIVISION_') and value == 1:
                 subdivision = key.replace('SUBDIVISION_', '')
-                regional_info = ml_service.get_regional_info(subdivision)
+                # The aggregates include rows ingested through any worker
+                regional_info = rainfall_aggregates.get_regional_info(subdivision)
+                if regional_info is None:
+                    regional_info = ml_service.get_regional_info(subdivision)
                 break
         
         # Determine confidence level
-        confidence = "Medium"
-        if prediction > 0.8 or prediction < 0.2:
-            confidence = "High"
-        elif prediction > 0.65 or prediction < 0.35:
-            confidence = "Medium"
-        else:
-            confidence = "Low"
+        confidence = ml_service.get_confidence(prediction)
         
         return PredictionOutput(
             prediction=float(prediction),
@@ -89,6 +137,68 @@ def predict_rainfall(input_data: PredictionInput):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/predict/bulk")
+async def predict_rainfall_bulk(request: Request, format: Optional[str] = None, chunk_size: int = BULK_CHUNK_ROWS):
+    """
+    Score an uploaded CSV or NDJSON table of inputs.
+
+    The upload is spooled to a temporary file (bounded memory) and then
+    parsed in chunks of `chunk_size` rows; each chunk is scored with batched
+    preprocessing and inference and streamed back (NDJSON by default, CSV
+    with `format=csv` or `Accept: text/csv`). The stream ends with a summary
+    of rows, chunks and throughput.
+    """
+    input_format = detect_format(request.headers.get("content-type"))
+    if input_format is None:
+        raise HTTPException(status_code=415, detail="Upload must be text/csv or application/x-ndjson")
+
+    output_format = format or detect_format(request.headers.get("accept"), default="ndjson")
+    if output_format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+
+    if chunk_size < 1 or chunk_size > BULK_MAX_CHUNK_ROWS:
+        raise HTTPException(status_code=400, detail=f"chunk_size must be between 1 and {BULK_MAX_CHUNK_ROWS}")
+
+    def score_chunk(chunk):
+        features = ml_service.preprocess_frame(chunk)
+        predictions = ml_service.predict_batch(features)
+        confidences = [ml_service.get_confidence(prediction) for prediction in predictions]
+        return predictions, confidences
+
+    body = await spool_body(request.stream())
+
+    async def generate():
+        start = time.perf_counter()
+        rows = 0
+        chunks = 0
+        try:
+            async for chunk in iter_record_chunks(iter_file(body), input_format, chunk_size):
+                predictions, confidences = await run_in_threadpool(score_chunk, chunk)
+                yield format_predictions(rows, predictions, confidences, output_format, include_header=chunks == 0)
+                rows += len(chunk)
+                chunks += 1
+        except Exception as e:
+            # The status line has already been sent, so report the failure in-band
+            print(f"Error during bulk scoring after {rows} rows: {e}")
+            error = {"error": str(e), "rows": rows}
+            yield format_summary(error, output_format)
+            return
+        finally:
+            body.close()
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            "rows": rows,
+            "chunks": chunks,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else None,
+        }
+        print(f"Bulk scoring finished: {summary}")
+        yield format_summary(summary, output_format)
+
+    media_type = "text/csv" if output_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type)
+
 @app.get("/stats", response_class=JSONResponse)
 def get_statistics():
     """
@@ -97,7 +207,7 @@ def get_statistics():
         A dictionary of statistics or raises HTTPException on failure.
     """
     try:
-        stats = get_rainfall_statistics()
+        stats = single_flight.do("stats", rainfall_aggregates.get_statistics)
 
         if not stats:
             raise HTTPException(status_code=404, detail="No statistics available")
@@ -117,13 +227,116 @@ def get_subdivision_data(data: dict):
     if not subdivision:
         raise HTTPException(status_code=400, detail="Subdivision is required")
     
-    regional_data = get_regional_data(subdivision)
+    # "KERALA", " KERALA " and "SUBDIVISION_KERALA" return the same data
+    subdivision = subdivision.strip()
+    if subdivision.startswith("SUBDIVISION_"):
+        subdivision = subdivision.replace("SUBDIVISION_", "", 1)
+    
+    regional_data = single_flight.do(
+        f"regional-data:{subdivision}", rainfall_aggregates.get_regional_data, subdivision
+    )
     if regional_data is None:
         raise HTTPException(status_code=404, detail=f"No data found for subdivision: {subdivision}")
     
     return regional_data
 
+@app.get("/metrics", response_class=JSONResponse)
+def get_metrics():
+    """Request coalescing and admission control counters"""
+    return {"single_flight": single_flight.get_metrics(), "admission": admission.get_metrics()}
+
+@app.get("/drift", response_class=JSONResponse)
+def get_drift():
+    """
+    Compare this worker's live /predict inputs with the training data:
+    per-feature PSI, null rates and quantiles, and subdivision/season mix.
+    """
+    report = drift_monitor.report()
+    if report is None:
+        raise HTTPException(status_code=404, detail="Model artifact has no drift reference; retrain the model to create one")
+    return report
+
+def _check_admin_token(request, disabled_detail):
+    """Reject the request unless X-Admin-Token matches RAINFALL_ADMIN_TOKEN"""
+    admin_token = os.getenv("RAINFALL_ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail=disabled_detail)
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def _is_positive(value, types):
+    """JSON numbers only: bool is an int subclass but not a valid count"""
+    return isinstance(value, types) and not isinstance(value, bool) and value > 0
+
+@app.post("/admin/profile", response_class=JSONResponse)
+def profile_requests(data: dict, request: Request):
+    """
+    Profile the request path for `seconds` seconds or `requests` requests.
+
+    Requires the X-Admin-Token header to match RAINFALL_ADMIN_TOKEN. Returns
+    flamegraph-ready collapsed stacks from a sampling profiler and the top
+    allocation sites recorded by tracemalloc during the session.
+    """
+    _check_admin_token(request, "Profiling is disabled")
+    
+    seconds = data.get("seconds")
+    max_requests = data.get("requests")
+    top_allocations = data.get("top_allocations", 25)
+    path_prefix = data.get("path_prefix", "/predict")
+    if seconds is None and max_requests is None:
+        raise HTTPException(status_code=400, detail="Either seconds or requests is required")
+    if seconds is not None and not _is_positive(seconds, (int, float)):
+        raise HTTPException(status_code=400, detail="seconds must be a positive number")
+    for name, value in (("requests", max_requests), ("top_allocations", top_allocations)):
+        if value is not None and not _is_positive(value, int):
+            raise HTTPException(status_code=400, detail=f"{name} must be a positive integer")
+    if not isinstance(path_prefix, str):
+        raise HTTPException(status_code=400, detail="path_prefix must be a string")
+    
+    session = profiler.start(
+        seconds=seconds,
+        max_requests=max_requests,
+        path_prefix=path_prefix,
+        top_allocations=top_allocations,
+        trace_allocations=bool(data.get("trace_allocations", True)),
+    )
+    if session is None:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+    
+    session.done.wait()
+    return session.result
+
+@app.post("/ingest", response_class=JSONResponse)
+def ingest_observations(data: dict, request: Request):
+    """
+    Append new observations (rows in rain_predictions1.csv format) to the
+    observation store and update the running aggregates incrementally.
+
+    Ingested rows are permanent, so this requires the X-Admin-Token header
+    to match RAINFALL_ADMIN_TOKEN.
+    """
+    _check_admin_token(request, "Ingestion is disabled")
+    
+    rows = data.get("rows")
+    if not rows or not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="A non-empty list of rows is required")
+    if not all(isinstance(row, dict) for row in rows):
+        raise HTTPException(status_code=400, detail="Every row must be an object")
+    
+    df = pd.DataFrame.from_records(rows)
+    if "YEAR" not in df.columns or df["YEAR"].isna().any():
+        raise HTTPException(status_code=400, detail="Every row must have a YEAR")
+    
+    try:
+        ingested, snapshot = rainfall_aggregates.ingest(df)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"success": True, "ingested": ingested, "total_records": snapshot.total_records}
+
 if __name__ == "__main__":
+    import uvicorn
+    
     # Run the API with uvicorn
     port = int(os.getenv("PORT", 8000))
     uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True)
\ No newline at end of file
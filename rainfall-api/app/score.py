@@ -0,0 +1,181 @@
+"""
+Offline batch scoring for large rainfall extracts.
+
+Reads a CSV or Parquet file in fixed-size chunks, scores the chunks on a
+process pool using the same preprocessing and model artifact as the API,
+and appends the predictions to a CSV output file in input order. After
+every chunk a checkpoint is written next to the output, so an interrupted
+run can be continued with --resume.
+
+Usage:
+    python -m app.score extract.csv predictions.csv --workers 8 --chunk-size 50000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+
+import pandas as pd
+
+from app.services.ml_model import MLModelService
+from app.utils.bulk import format_predictions
+
+# Model service used by the pool workers. When the pool is forked it is
+# inherited from the parent, so the artifact is only unpickled once.
+_service = None
+
+
+def _init_worker(model_path):
+    global _service
+    if _service is None:
+        _service = MLModelService(model_path=model_path)
+        _service.load_artifact()
+
+
+def _score_chunk(first_row, chunk):
+    features = _service.preprocess_frame(chunk)
+    predictions = _service.predict_batch(features)
+    confidences = [_service.get_confidence(prediction) for prediction in predictions]
+    return len(chunk), format_predictions(first_row, predictions, confidences, "csv")
+
+
+def iter_chunks(input_path, chunk_size, skip_rows=0):
+    """Yield DataFrames of at most chunk_size rows, skipping the first skip_rows rows"""
+    if input_path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Reading Parquet input requires pyarrow: pip install pyarrow")
+
+        skipped = 0
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size):
+            if skipped < skip_rows:
+                skipped += batch.num_rows
+                continue
+            yield batch.to_pandas()
+    else:
+        skip = range(1, skip_rows + 1) if skip_rows else None
+        yield from pd.read_csv(input_path, chunksize=chunk_size, skiprows=skip)
+
+
+class Checkpoint:
+    """Progress record stored next to the output file"""
+
+    def __init__(self, output_path):
+        self.path = output_path + ".checkpoint.json"
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, state):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score a large rainfall extract on all cores")
+    parser.add_argument("input", help="Input .csv or .parquet file")
+    parser.add_argument("output", help="Output CSV file (row, prediction, confidence)")
+    parser.add_argument("--model", default=None, help="Model artifact path (default: the serving model)")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last completed chunk")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    args.model = args.model or MLModelService().model_path
+    if not os.path.exists(args.model):
+        raise SystemExit(f"Model artifact not found at {args.model}; start the API or train a model first")
+
+    checkpoint = Checkpoint(args.output)
+    state = {
+        "input": os.path.abspath(args.input),
+        "chunk_size": args.chunk_size,
+        "chunks_done": 0,
+        "rows_done": 0,
+        "output_bytes": 0,
+        "complete": False,
+    }
+    previous = checkpoint.load() if args.resume else None
+    if previous is not None:
+        if previous["input"] != state["input"] or previous["chunk_size"] != state["chunk_size"]:
+            raise SystemExit("Checkpoint was written for a different input or chunk size; rerun without --resume")
+        if not os.path.exists(args.output):
+            raise SystemExit(f"Checkpoint found but {args.output} is missing; rerun without --resume")
+        if previous["complete"]:
+            print(f"{args.output} is already complete ({previous['rows_done']} rows)")
+            return
+        state = previous
+        print(f"Resuming after chunk {state['chunks_done']} ({state['rows_done']} rows)")
+    elif args.resume:
+        print("No checkpoint found, starting from the beginning")
+
+    # Drop anything written after the last checkpointed chunk
+    output = open(args.output, "r+" if previous is not None else "w")
+    output.truncate(state["output_bytes"])
+    output.seek(state["output_bytes"])
+    if state["output_bytes"] == 0:
+        output.write("row,prediction,confidence\n")
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    if context.get_start_method() == "fork":
+        _init_worker(args.model)
+
+    start = time.perf_counter()
+    rows_scored = 0
+    max_pending = args.workers * 2
+    pending = deque()
+    next_row = state["rows_done"]
+
+    def write_result(result):
+        nonlocal rows_scored
+        rows, text = result
+        output.write(text)
+        output.flush()
+        os.fsync(output.fileno())
+        rows_scored += rows
+        state["chunks_done"] += 1
+        state["rows_done"] += rows
+        state["output_bytes"] = output.tell()
+        checkpoint.save(state)
+        elapsed = time.perf_counter() - start
+        print(f"Chunk {state['chunks_done']}: {state['rows_done']} rows written, "
+              f"{rows_scored / elapsed:.0f} rows/s")
+
+    with context.Pool(args.workers, initializer=_init_worker, initargs=(args.model,)) as pool:
+        for chunk in iter_chunks(args.input, args.chunk_size, skip_rows=state["rows_done"]):
+            pending.append(pool.apply_async(_score_chunk, (next_row, chunk)))
+            next_row += len(chunk)
+            # Bound memory by limiting the number of chunks in flight, and
+            # write completed chunks in input order
+            while len(pending) >= max_pending or (pending and pending[0].ready()):
+                write_result(pending.popleft().get())
+        while pending:
+            write_result(pending.popleft().get())
+
+    state["complete"] = True
+    checkpoint.save(state)
+    output.close()
+
+    elapsed = time.perf_counter() - start
+    rate = rows_scored / elapsed if elapsed > 0 else 0
+    print(f"Scored {rows_scored} rows in {elapsed:.2f}s ({rate:.0f} rows/s) with {args.workers} workers")
+    print(f"Predictions written to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Production launcher for the Rainfall Prediction API.
+
+The dataset and model are loaded once in the parent process, which then
+binds the listening socket and forks the workers. Workers inherit the
+preloaded objects copy-on-write instead of each re-reading the CSV and
+unpickling the forest. SIGTERM/SIGINT are forwarded to the workers, which
+stop accepting connections and drain in-flight requests before exiting.
+
+Usage:
+    python -m app.serve --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+
+def parse_args(argv=None):
+    """Parse command line options, falling back to environment variables"""
+    parser = argparse.ArgumentParser(description="Run the Rainfall Prediction API in production mode")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                        help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("KEEP_ALIVE", 15)),
+                        help="Seconds to keep idle HTTP connections open")
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("BACKLOG", 2048)),
+                        help="Maximum number of pending connections on the listening socket")
+    parser.add_argument("--limit-concurrency", type=int, default=int(os.getenv("LIMIT_CONCURRENCY", 256)),
+                        help="Maximum concurrent connections per worker before responding with 503")
+    parser.add_argument("--limit-max-requests", type=int, default=int(os.getenv("LIMIT_MAX_REQUESTS", 0)),
+                        help="Recycle a worker after this many requests (0 disables)")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", 30)),
+                        help="Seconds a worker may spend draining in-flight requests on shutdown")
+    parser.add_argument("--access-log", action="store_true", help="Enable per-request access logging")
+    return parser.parse_args(argv)
+
+
+def bind_socket(host, port, backlog):
+    """Create the listening socket shared by all workers"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """Import the app and load the dataset and model in the parent process"""
+    from app.main import app, ml_service, rainfall_aggregates
+
+    start = time.perf_counter()
+    if rainfall_aggregates.shared is not None:
+        # Workers (and other servers on this host) attach to the published tables
+        rainfall_aggregates.publish_shared()
+    else:
+        # Build the aggregates here so workers do not each re-read the CSV
+        rainfall_aggregates.refresh()
+    ml_service.load_model()
+    print(f"Preloaded dataset and model in {time.perf_counter() - start:.2f}s")
+
+    # Move everything allocated so far out of the collector's generations so
+    # that garbage collection in the workers does not touch (and copy) the
+    # pages holding the shared dataset and forest.
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def run_worker(app, sock, args):
+    """Serve requests in a forked worker until asked to exit"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    config = uvicorn.Config(
+        app,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        limit_concurrency=args.limit_concurrency or None,
+        limit_max_requests=args.limit_max_requests or None,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=args.access_log,
+    )
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+class Supervisor:
+    """Fork, monitor and drain the worker processes"""
+
+    def __init__(self, app, sock, args):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers = set()
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                run_worker(self.app, self.sock, self.args)
+            except Exception:
+                import traceback
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(exit_code)
+        self.workers.add(pid)
+        print(f"Started worker {pid}")
+
+    def handle_signal(self, sig, frame):
+        if not self.stopping:
+            print(f"Received signal {sig}, draining {len(self.workers)} workers")
+        self.stopping = True
+        self.signal_workers(signal.SIGTERM)
+
+    def signal_workers(self, sig):
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                self.workers.discard(pid)
+
+    def reap(self):
+        """Collect exited workers, returning how many were reaped"""
+        reaped = 0
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                break
+            if pid == 0:
+                break
+            self.workers.discard(pid)
+            reaped += 1
+            if not self.stopping:
+                print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+        return reaped
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+
+        for _ in range(self.args.workers):
+            self.spawn()
+
+        while not self.stopping:
+            if self.reap():
+                # Keep the pool at full size; workers recycled by
+                # --limit-max-requests or crashed workers are replaced.
+                while len(self.workers) < self.args.workers and not self.stopping:
+                    self.spawn()
+            time.sleep(0.2)
+
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+
+        if self.workers:
+            print(f"Killing {len(self.workers)} workers that did not drain in time")
+            self.signal_workers(signal.SIGKILL)
+            while self.workers:
+                self.reap()
+                time.sleep(0.1)
+
+        self.sock.close()
+        print("All workers stopped")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = preload()
+    sock = bind_socket(args.host, args.port, args.backlog)
+    print(f"Serving on {args.host}:{args.port} with {args.workers} workers")
+    Supervisor(app, sock, args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import math
+import time
+from collections import deque
+
+
+class Rejected(Exception):
+    """A request was refused admission"""
+
+    def __init__(self, status_code, reason, retry_after=None):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded concurrency and queueing with deadline-aware load shedding.
+
+    At most `max_concurrency` requests run at once and at most `max_queue`
+    wait. A request is rejected up front with 429 when the queue is full,
+    and with 503 when its deadline has passed or the expected queueing plus
+    service time (an EWMA of recent requests) would overrun it. Queued
+    requests whose deadline expires while waiting are dropped with 503.
+    All state is touched only from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_concurrency, max_queue, default_timeout, ewma_alpha=0.2):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self.ewma_alpha = ewma_alpha
+        self.service_time = 0.0
+        self.active = 0
+        self._waiters = deque()
+        self.counters = {
+            "admitted": 0,
+            "completed": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+            "expired_on_arrival": 0,
+            "expired_in_queue": 0,
+        }
+
+    def _retry_after(self):
+        queued = len(self._waiters) + self.active
+        return max(1, math.ceil(queued * self.service_time / max(self.max_concurrency, 1)))
+
+    async def acquire(self, deadline):
+        """Wait for a slot; raises Rejected if the request cannot finish by its deadline"""
+        now = time.monotonic()
+        remaining = deadline - now
+        if remaining <= 0:
+            self.counters["expired_on_arrival"] += 1
+            raise Rejected(503, "Request deadline already expired")
+
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.counters["admitted"] += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.counters["shed_queue_full"] += 1
+            raise Rejected(429, "Too many queued requests", retry_after=self._retry_after())
+
+        expected_wait = (len(self._waiters) + 1) / self.max_concurrency * self.service_time
+        if expected_wait + self.service_time > remaining:
+            self.counters["shed_deadline"] += 1
+            raise Rejected(503, "Request cannot complete before its deadline", retry_after=self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # Leave time to actually serve the request once it is admitted
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max(remaining - self.service_time, 0))
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.counters["expired_in_queue"] += 1
+            raise Rejected(503, "Request deadline expired while queued", retry_after=self._retry_after())
+        except asyncio.CancelledError:
+            # The client went away while queued
+            self._abandon(waiter)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self.counters["admitted"] += 1
+
+    def _abandon(self, waiter):
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as the wait ended; pass it on
+            self.release(0.0, completed=False)
+        else:
+            waiter.cancel()
+
+    def release(self, elapsed, completed=True):
+        """Free a slot, handing it directly to the next live waiter"""
+        if completed:
+            self.counters["completed"] += 1
+            self.service_time += self.ewma_alpha * (elapsed - self.service_time)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def get_metrics(self):
+        return {
+            **self.counters,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "service_time_ms": round(self.service_time * 1000, 2),
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to selected paths.
+
+    The request deadline comes from the X-Request-Timeout-Ms header (the
+    caller's remaining time budget) or the controller's default timeout.
+    """
+
+    def __init__(self, app, controller, paths):
+        self.app = app
+        self.controller = controller
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        timeout = self.controller.default_timeout
+        for name, value in scope["headers"]:
+            if name == b"x-request-timeout-ms":
+                try:
+                    timeout = float(value) / 1000
+                except ValueError:
+                    pass
+                break
+
+        try:
+            await self.controller.acquire(time.monotonic() + timeout)
+        except Rejected as e:
+            await self._reject(send, e)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.monotonic() - start)
+
+    async def _reject(self, send, rejection):
+        body = json.dumps({"detail": rejection.reason}).encode()
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        if rejection.retry_after is not None:
+            headers.append((b"retry-after", str(rejection.retry_after).encode()))
+        await send({"type": "http.response.start", "status": rejection.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
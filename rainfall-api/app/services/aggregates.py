@@ -0,0 +1,498 @@
+import json
+import math
+import os
+import threading
+import numpy as np
+import pandas as pd
+from app.utils.data import find_dataset_path
+from app.utils.store import ObservationStore
+
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+SEASONS = {
+    "winter": ["JAN", "FEB"],
+    "pre_monsoon": ["MAR", "APR", "MAY"],
+    "monsoon": ["JUN", "JUL", "AUG", "SEP"],
+    "post_monsoon": ["OCT", "NOV", "DEC"],
+}
+# /regional-data reads the renamed column, the artifact's regional stats the raw one
+MONSOON_COLUMNS = ["Jun_Sep", "Jun-Sep"]
+# Columns of the shared per-region totals table; missing sums are stored as NaN
+REGION_FIELDS = ["count", "annual_sum", "rain_sum", "has_rain"] + MONSOON_COLUMNS + MONTHS
+
+
+class _Snapshot:
+    """Immutable view of the aggregates; readers only ever see complete snapshots"""
+
+    def __init__(self):
+        self.columns = frozenset()
+        self.total_records = 0
+        self.store_offset = 0
+        self.start_year = None
+        self.end_year = None
+        # Welford state for ANNUAL, skipping missing values like pandas does
+        self.annual = {"n": 0, "mean": 0.0, "m2": 0.0, "min": None, "max": None}
+        self.season_sums = {season: 0.0 for season in SEASONS}
+        self.subdivisions = ()
+        # Region name -> totals dict; entries are replaced, never mutated.
+        # Over shared tables, only regions updated since the publish
+        self.regions = {}
+        # Region name -> (append-only list of (year, annual), visible length).
+        # Over shared tables, only years added since the publish
+        self.history = {}
+        # Shared tables this snapshot was attached from, if any, and the
+        # row of each region in them
+        self.tables = None
+        self.table_regions = {}
+
+    def copy(self):
+        snapshot = _Snapshot()
+        snapshot.__dict__.update(self.__dict__)
+        snapshot.annual = dict(self.annual)
+        snapshot.season_sums = dict(self.season_sums)
+        snapshot.regions = dict(self.regions)
+        snapshot.history = dict(self.history)
+        return snapshot
+
+    def region_names(self):
+        return list(self.table_regions) + [name for name in self.regions if name not in self.table_regions]
+
+    def region_totals(self, region):
+        """Totals dict for a region, or None if it is unknown"""
+        totals = self.regions.get(region)
+        if totals is not None or region not in self.table_regions:
+            return totals
+        # Read straight from the shared row; NaN marks a sum that was never seen
+        row = self.tables.arrays["region_totals"][self.table_regions[region]].tolist()
+        values = {field: value for field, value in zip(self.tables.info["region_fields"], row) if value == value}
+        return {
+            "count": int(values["count"]),
+            "annual_sum": values["annual_sum"],
+            "monsoon_sums": {col: values[col] for col in MONSOON_COLUMNS if col in values},
+            "rain_sum": values["rain_sum"],
+            "has_rain": bool(values["has_rain"]),
+            "month_sums": {month: values[month] for month in MONTHS if month in values},
+        }
+
+    def published_history(self, region):
+        """Views of a region's published years and annual totals (empty without shared tables)"""
+        index = self.table_regions.get(region)
+        if index is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        offsets = self.tables.arrays["history_offsets"]
+        start, end = offsets[index], offsets[index + 1]
+        return self.tables.arrays["history_years"][start:end], self.tables.arrays["history_annual"][start:end]
+
+    def region_history(self, region):
+        """A region's (year, annual) pairs: the published series, then those added since"""
+        years, annual = self.published_history(region)
+        series, length = self.history.get(region, ([], 0))
+        return list(zip(years.tolist(), annual.tolist())) + series[:length]
+
+
+class RainfallAggregates:
+    """
+    Running rainfall aggregates behind /stats, /regional-data and regional_info.
+
+    The aggregates are built once from the base dataset and then updated in
+    O(new rows) from rows appended to the observation store. Updates build a
+    new snapshot under a writer lock and publish it with a single reference
+    assignment, so readers never wait for an update in progress.
+    """
+
+    def __init__(self, store, shared=None):
+        self.store = store
+        self.shared = shared
+        self._write_lock = threading.Lock()
+        self._snapshot = None
+        # Writer-only state: years in each region's series in snapshot.history
+        self._history_years = {}
+
+    def _ensure_built(self):
+        if self._snapshot is not None:
+            return self._snapshot
+        with self._write_lock:
+            if self._snapshot is None:
+                # Attach to tables published by another process before parsing the CSV ourselves
+                tables = self.shared.attach() if self.shared is not None else None
+                if tables is not None:
+                    self._snapshot = self._from_tables(tables)
+                    self._catch_up()
+                else:
+                    self._snapshot = self._build_from_source()
+        return self._snapshot
+
+    def _build_from_source(self):
+        """Build a snapshot from the base dataset and the whole store"""
+        dataset_path = find_dataset_path()
+        if dataset_path is not None:
+            print(f"Building rainfall aggregates from: {dataset_path}")
+            base = pd.read_csv(dataset_path)
+            # New stores get the base dataset's columns as their header
+            if self.store.default_columns is None:
+                self.store.default_columns = base.columns.tolist()
+        else:
+            # Without a dataset only ingested observations are aggregated;
+            # synthetic data is never mixed into the statistics
+            print("No rainfall dataset found; aggregating ingested observations only")
+            base = pd.DataFrame()
+        self._history_years = {}
+        snapshot = _Snapshot()
+        snapshot = self._apply(snapshot, base)
+        rows, offset = self.store.read_since(0)
+        if rows is not None:
+            snapshot = self._apply(snapshot, rows)
+        snapshot.store_offset = offset
+        return snapshot
+
+    def publish_shared(self):
+        """
+        Rebuild the aggregates from the dataset and store and publish them
+        to the shared tables. Returns the published version.
+        """
+        with self._write_lock:
+            snapshot = self._build_from_source()
+            regions = snapshot.region_names()
+            totals = np.full((len(regions), len(REGION_FIELDS)), np.nan)
+            history_offsets = [0]
+            history_years, history_annual = [], []
+            for i, region in enumerate(regions):
+                region_totals = snapshot.region_totals(region)
+                values = {
+                    "count": region_totals["count"],
+                    "annual_sum": region_totals["annual_sum"],
+                    "rain_sum": region_totals["rain_sum"],
+                    "has_rain": float(region_totals["has_rain"]),
+                    **region_totals["monsoon_sums"],
+                    **region_totals["month_sums"],
+                }
+                for j, field in enumerate(REGION_FIELDS):
+                    if field in values:
+                        totals[i, j] = values[field]
+                series = snapshot.region_history(region)
+                history_years.extend(year for year, _ in series)
+                history_annual.extend(annual for _, annual in series)
+                history_offsets.append(len(history_years))
+
+            info = {
+                "columns": sorted(snapshot.columns),
+                "total_records": snapshot.total_records,
+                "store_offset": snapshot.store_offset,
+                "start_year": snapshot.start_year,
+                "end_year": snapshot.end_year,
+                "annual": snapshot.annual,
+                "season_sums": snapshot.season_sums,
+                "subdivisions": list(snapshot.subdivisions),
+                "regions": regions,
+                "region_fields": REGION_FIELDS,
+            }
+            version = self.shared.publish({
+                "region_totals": totals,
+                "history_offsets": np.array(history_offsets, dtype=np.int64),
+                "history_years": np.array(history_years, dtype=np.int64),
+                "history_annual": np.array(history_annual, dtype=np.float64),
+            }, info)
+
+            # Serve from the mapped copy so forked workers share its pages
+            tables = self.shared.attach()
+            self._snapshot = self._from_tables(tables) if tables is not None else snapshot
+            self._catch_up()
+        print(f"Published shared rainfall tables version {version} to {self.shared.path}")
+        return version
+
+    def _from_tables(self, tables):
+        """
+        Snapshot over a published version of the shared tables (writer lock
+        held). Regional totals and history are read from the mapped arrays;
+        only rows applied afterwards are kept in this process.
+        """
+        info = tables.info
+        snapshot = _Snapshot()
+        snapshot.tables = tables
+        snapshot.table_regions = {region: i for i, region in enumerate(info["regions"])}
+        snapshot.columns = frozenset(info["columns"])
+        snapshot.total_records = info["total_records"]
+        snapshot.store_offset = info["store_offset"]
+        snapshot.start_year = info["start_year"]
+        snapshot.end_year = info["end_year"]
+        snapshot.annual = info["annual"]
+        snapshot.season_sums = info["season_sums"]
+        snapshot.subdivisions = tuple(info["subdivisions"])
+        self._history_years = {}
+        return snapshot
+
+    def _reattach(self):
+        """Switch to a newer version of the shared tables (writer lock held)"""
+        tables = self.shared.attach()
+        if tables is None:
+            return self._snapshot
+        self._snapshot = self._from_tables(tables)
+        return self._catch_up()
+
+    def refresh(self):
+        """Apply rows appended to the store since the last refresh and return the current snapshot"""
+        snapshot = self._ensure_built()
+        if self.shared is not None:
+            # A read from the mapped control file once something has been published
+            attached = snapshot.tables.version if snapshot.tables is not None else None
+            if self.shared.current_version() != attached:
+                if not self._write_lock.acquire(blocking=False):
+                    return snapshot
+                try:
+                    snapshot = self._reattach()
+                finally:
+                    self._write_lock.release()
+        if self.store.size() <= snapshot.store_offset:
+            return snapshot
+        # Readers never block on a refresh: if another thread is already
+        # catching up, serve the current snapshot
+        if not self._write_lock.acquire(blocking=False):
+            return snapshot
+        try:
+            return self._catch_up()
+        finally:
+            self._write_lock.release()
+
+    def _catch_up(self):
+        snapshot = self._snapshot
+        rows, offset = self.store.read_since(snapshot.store_offset)
+        if rows is None:
+            return snapshot
+        snapshot = self._apply(snapshot.copy(), rows)
+        snapshot.store_offset = offset
+        self._snapshot = snapshot
+        return snapshot
+
+    def ingest(self, df):
+        """Append rows to the store and fold them into the aggregates"""
+        self._ensure_built()
+        with self._write_lock:
+            written = self.store.append(df)
+            snapshot = self._catch_up()
+        return written, snapshot
+
+    def _apply(self, snapshot, df):
+        """Fold a batch of rows into a (private, not yet published) snapshot"""
+        if df.empty:
+            return snapshot
+
+        snapshot.columns = snapshot.columns | frozenset(df.columns)
+        snapshot.total_records += len(df)
+
+        if "YEAR" in df.columns:
+            years = df["YEAR"].dropna()
+            if not years.empty:
+                start, end = int(years.min()), int(years.max())
+                snapshot.start_year = start if snapshot.start_year is None else min(snapshot.start_year, start)
+                snapshot.end_year = end if snapshot.end_year is None else max(snapshot.end_year, end)
+
+        if "ANNUAL" in df.columns:
+            snapshot.annual = _merge_welford(snapshot.annual, df["ANNUAL"].dropna().to_numpy(dtype=float))
+
+        if all(month in df.columns for month in MONTHS):
+            for season, months in SEASONS.items():
+                snapshot.season_sums[season] += float(df[months].sum(axis=1).sum())
+
+        if "SUBDIVISION" in df.columns:
+            known = set(snapshot.subdivisions)
+            new = [name for name in df["SUBDIVISION"].dropna().unique().tolist() if name not in known]
+            snapshot.subdivisions = snapshot.subdivisions + tuple(new)
+
+        # Regional aggregates use the same missing-value handling as load_dataset
+        filled = df.fillna(0)
+        new_history = {}
+        for col in filled.columns:
+            if not col.startswith("SUBDIVISION_"):
+                continue
+            region_rows = filled[filled[col] == 1]
+            if region_rows.empty:
+                continue
+            region = col.replace("SUBDIVISION_", "")
+            snapshot.regions[region] = self._merge_region(snapshot.region_totals(region), region_rows)
+            new_history[region] = self._new_history(snapshot, region, region_rows)
+
+        # Writer state shared between snapshots is only touched once the
+        # whole batch has been folded in
+        for region, entries in new_history.items():
+            self._extend_history(snapshot, region, entries)
+
+        return snapshot
+
+    def _merge_region(self, totals, rows):
+        totals = dict(totals) if totals is not None else {
+            "count": 0,
+            "annual_sum": 0.0,
+            "monsoon_sums": {},
+            "rain_sum": 0.0,
+            "has_rain": False,
+            "month_sums": {},
+        }
+        totals["count"] += len(rows)
+        if "ANNUAL" in rows.columns:
+            totals["annual_sum"] += float(rows["ANNUAL"].sum())
+        monsoon_sums = dict(totals["monsoon_sums"])
+        for col in MONSOON_COLUMNS:
+            if col in rows.columns:
+                monsoon_sums[col] = monsoon_sums.get(col, 0.0) + float(rows[col].sum())
+        totals["monsoon_sums"] = monsoon_sums
+        if "PredictedRainTomorrow" in rows.columns:
+            totals["rain_sum"] += float(rows["PredictedRainTomorrow"].sum())
+            totals["has_rain"] = True
+        month_sums = dict(totals["month_sums"])
+        for month in MONTHS:
+            if month in rows.columns:
+                month_sums[month] = month_sums.get(month, 0.0) + float(rows[month].sum())
+        totals["month_sums"] = month_sums
+        return totals
+
+    def _new_history(self, snapshot, region, rows):
+        """(year, annual) pairs from a batch that are not yet in the region's series, or None"""
+        if "YEAR" not in rows.columns or "ANNUAL" not in rows.columns:
+            return None
+        published, _ = snapshot.published_history(region)
+        seen = self._history_years.get(region, set()).union(published.tolist())
+        entries = []
+        years = set()
+        # Keep the first observation of every year, in order of appearance
+        for year, annual in zip(rows["YEAR"].tolist(), rows["ANNUAL"].tolist()):
+            if 1901 <= year <= 2023 and year not in seen and year not in years:
+                years.add(year)
+                entries.append((int(year), float(annual)))
+        return entries
+
+    def _extend_history(self, snapshot, region, entries):
+        if entries is None:
+            return
+        series, _ = snapshot.history.get(region, (None, 0))
+        if series is None:
+            series = []
+        series.extend(entries)
+        self._history_years.setdefault(region, set()).update(year for year, _ in entries)
+        # The list is shared with older snapshots, which only read up to
+        # the length they were published with
+        snapshot.history[region] = (series, len(series))
+
+    def get_statistics(self):
+        """Return the /stats payload, or None if there are no observations"""
+        snapshot = self.refresh()
+        if snapshot.total_records == 0:
+            return None
+
+        annual = snapshot.annual
+        has_annual = "ANNUAL" in snapshot.columns and annual["n"] > 0
+        stats = {
+            "total_records": snapshot.total_records,
+            "time_period": {
+                "start_year": snapshot.start_year,
+                "end_year": snapshot.end_year,
+            },
+            "overall_stats": {
+                "mean_annual_rainfall": annual["mean"] if has_annual else None,
+                "max_annual_rainfall": annual["max"] if has_annual else None,
+                "min_annual_rainfall": annual["min"] if has_annual else None,
+                "std_annual_rainfall": math.sqrt(annual["m2"] / (annual["n"] - 1)) if has_annual and annual["n"] > 1 else None,
+            },
+            "subdivisions": list(snapshot.subdivisions),
+        }
+
+        if all(month in snapshot.columns for month in MONTHS) and snapshot.total_records:
+            stats["seasonal_stats"] = {
+                season: total / snapshot.total_records for season, total in snapshot.season_sums.items()
+            }
+
+        return json.loads(json.dumps(stats, default=str))
+
+    def _find_region(self, snapshot, subdivision):
+        """Resolve a subdivision name (with or without the SUBDIVISION_ prefix) to a region key"""
+        name = subdivision.replace("SUBDIVISION_", "") if subdivision.startswith("SUBDIVISION_") else subdivision
+        if name in snapshot.regions or name in snapshot.table_regions:
+            return name
+        matches = [region for region in snapshot.region_names() if name in region]
+        return matches[0] if matches else None
+
+    def get_regional_info(self, subdivision):
+        """Return a subdivision's stats in the format stored in the model artifact, or None"""
+        snapshot = self.refresh()
+        totals = snapshot.region_totals(subdivision.replace("SUBDIVISION_", ""))
+        if totals is None:
+            return None
+        avg_annual = totals["annual_sum"] / totals["count"]
+        return {
+            "avg_annual_rainfall": avg_annual,
+            "monsoon_rainfall_pct": (totals["monsoon_sums"].get("Jun-Sep", 0.0) / totals["count"] / avg_annual) * 100 if avg_annual > 0 else 0,
+            "rain_probability": totals["rain_sum"] / totals["count"],
+            "sample_count": totals["count"],
+        }
+
+    def get_regional_data(self, subdivision):
+        """Return the /regional-data payload for a subdivision, or None if it is unknown"""
+        snapshot = self.refresh()
+        region = self._find_region(snapshot, subdivision)
+        if region is None:
+            print(f"No data found for subdivision: {subdivision}")
+            return None
+        if subdivision.startswith("SUBDIVISION_"):
+            subdivision = subdivision.replace("SUBDIVISION_", "")
+
+        totals = snapshot.region_totals(region)
+        count = totals["count"]
+        monthly_averages = {
+            month: totals["month_sums"][month] / count for month in MONTHS if month in totals["month_sums"]
+        }
+
+        # Determine seasonal pattern based on monthly averages
+        if monthly_averages:
+            max_month = max(monthly_averages, key=monthly_averages.get)
+            if max_month in ["JUN", "JUL", "AUG", "SEP"]:
+                seasonal_pattern = f"{subdivision} receives most of its rainfall during the Southwest Monsoon season (June-September), with peak rainfall in {max_month}."
+            elif max_month in ["OCT", "NOV"]:
+                seasonal_pattern = f"{subdivision} receives significant rainfall during the Northeast Monsoon (October-December), with peak rainfall in {max_month}."
+            else:
+                seasonal_pattern = f"{subdivision} has an unusual rainfall pattern with peak rainfall in {max_month}."
+        else:
+            seasonal_pattern = f"No monthly data available for {subdivision}."
+
+        annual_rainfall = totals["annual_sum"] / count if "ANNUAL" in snapshot.columns else 0
+        monsoon_rainfall_pct = 0
+        if "Jun_Sep" in totals["monsoon_sums"] and annual_rainfall > 0:
+            monsoon_rainfall_pct = (totals["monsoon_sums"]["Jun_Sep"] / count / annual_rainfall) * 100
+
+        regional_data = {
+            "subdivision": subdivision,
+            "avg_annual_rainfall": annual_rainfall,
+            "monsoon_rainfall_pct": monsoon_rainfall_pct,
+            "rain_probability": totals["rain_sum"] / count if totals["has_rain"] else 0,
+            "monthly_averages": monthly_averages,
+            "seasonal_pattern": seasonal_pattern,
+        }
+
+        if "YEAR" in snapshot.columns and "ANNUAL" in snapshot.columns:
+            regional_data["historical_data"] = [
+                {"year": year, "annual_rainfall": annual} for year, annual in snapshot.region_history(region)
+            ]
+
+        return regional_data
+
+
+def _merge_welford(state, values):
+    """Merge a batch of values into a running count/mean/M2/min/max (Chan et al.)"""
+    if values.size == 0:
+        return state
+    n_a, mean_a, m2_a = state["n"], state["mean"], state["m2"]
+    n_b = values.size
+    mean_b = float(values.mean())
+    m2_b = float(((values - mean_b) ** 2).sum())
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    batch_min, batch_max = float(values.min()), float(values.max())
+    return {
+        "n": n,
+        "mean": mean_a + delta * n_b / n,
+        "m2": m2_a + m2_b + delta * delta * n_a * n_b / n,
+        "min": batch_min if state["min"] is None else min(state["min"], batch_min),
+        "max": batch_max if state["max"] is None else max(state["max"], batch_max),
+    }
+
+
+def get_ingest_store():
+    """Observation store configured by RAINFALL_INGEST_PATH"""
+    return ObservationStore(os.getenv("RAINFALL_INGEST_PATH", "./data/ingested_observations.csv"))
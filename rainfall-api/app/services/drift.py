@@ -0,0 +1,275 @@
+import bisect
+import math
+import threading
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+
+SEASON_COLUMNS = ["SPRING", "SUMMER", "MONSOON", "AUTUMN", "WINTER"]
+# Reference bins are cut at these training quantiles
+BIN_QUANTILES = [i / 10 for i in range(1, 10)]
+REPORT_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+# Conventional population stability index thresholds
+PSI_MODERATE = 0.1
+PSI_DRIFT = 0.25
+# Absolute change in a feature's null rate that counts as drift
+NULL_RATE_DRIFT = 0.1
+
+
+def _category(values, columns, prefix=""):
+    """Name of the first one-hot column set to 1, or NONE"""
+    for col in columns:
+        value = values.get(col)
+        if value is not None and value == 1:
+            return col[len(prefix):]
+    return "NONE"
+
+
+def build_reference(X, null_mask=None):
+    """
+    Reference sketches of the training inputs (before imputation): quantile
+    bins, exact quantiles and null rates per numeric feature, plus
+    subdivision and season counts. `null_mask` marks the values that were
+    missing in the raw dataset, since load_dataset fills them before
+    training; they are counted as nulls rather than as zeros.
+    Plain dicts, so they can be stored in the model artifact.
+    """
+    subdivision_cols = [col for col in X.columns if col.startswith("SUBDIVISION_")]
+    season_cols = [col for col in SEASON_COLUMNS if col in X.columns]
+    numeric = {}
+    for col in X.columns:
+        if col in subdivision_cols or col in season_cols:
+            continue
+        values = pd.to_numeric(X[col], errors="coerce").to_numpy(dtype=float, copy=True)
+        if null_mask is not None and col in null_mask.columns:
+            values[null_mask[col].reindex(X.index, fill_value=False).to_numpy(dtype=bool)] = np.nan
+        present = values[~np.isnan(values)]
+        edges = sorted(set(np.quantile(present, BIN_QUANTILES).tolist())) if present.size else []
+        counts = np.bincount(np.searchsorted(edges, present, side="right"), minlength=len(edges) + 1)
+        numeric[col] = {
+            "edges": edges,
+            "counts": counts.tolist(),
+            "null_rate": (values.size - present.size) / values.size if values.size else 0.0,
+            "quantiles": dict(zip(map(str, REPORT_QUANTILES), np.quantile(present, REPORT_QUANTILES).tolist()))
+            if present.size else {},
+        }
+
+    records = X[subdivision_cols + season_cols].to_dict("records")
+    subdivisions, seasons = {}, {}
+    for values in records:
+        name = _category(values, subdivision_cols, "SUBDIVISION_")
+        subdivisions[name] = subdivisions.get(name, 0) + 1
+        name = _category(values, season_cols)
+        seasons[name] = seasons.get(name, 0) + 1
+
+    return {
+        "rows": len(X),
+        "numeric": numeric,
+        "subdivision_columns": subdivision_cols,
+        "season_columns": season_cols,
+        "subdivisions": subdivisions,
+        "seasons": seasons,
+    }
+
+
+def psi(expected, actual):
+    """Population stability index between two count vectors"""
+    expected_total, actual_total = sum(expected), sum(actual)
+    if not expected_total or not actual_total:
+        return None
+    total = 0.0
+    for e, a in zip(expected, actual):
+        e = max(e / expected_total, 1e-4)
+        a = max(a / actual_total, 1e-4)
+        total += (a - e) * math.log(a / e)
+    return total
+
+
+def _status(value):
+    if value is None:
+        return "no_data"
+    if value >= PSI_DRIFT:
+        return "drift"
+    if value >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+
+class _LiveSketch:
+    """Fixed-size live summary of one numeric feature, binned on the reference edges"""
+
+    __slots__ = ("edges", "counts", "nulls", "min", "max")
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.nulls = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        if value is None or value != value:
+            self.nulls += 1
+            return
+        self.counts[bisect.bisect_right(self.edges, value)] += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating within the bins"""
+        total = sum(self.counts)
+        if not total:
+            return None
+        target = q * total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= target:
+                low = self.edges[i - 1] if i > 0 else self.min
+                high = self.edges[i] if i < len(self.edges) else self.max
+                low, high = max(low, self.min), min(high, self.max)
+                return low + (high - low) * (target - seen) / count
+            seen += count
+        return self.max
+
+
+class DriftMonitor:
+    """
+    Streaming comparison of live /predict inputs against the training reference.
+
+    The request path only appends the input object to a bounded deque
+    (inputs beyond `max_pending` are dropped and counted). A background
+    thread drains it every `interval` seconds into fixed-size sketches, so
+    memory does not grow with traffic. Sketches are per process.
+    """
+
+    def __init__(self, max_pending=10000, interval=1.0):
+        self.max_pending = max_pending
+        self.interval = interval
+        # Waiting on an event rather than sleeping keeps the profiler from
+        # counting this thread as busy
+        self._wakeup = threading.Event()
+        self.reference = None
+        self.dropped = 0
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._reset(None)
+
+    def _reset(self, reference):
+        self.reference = reference
+        self.observed = 0
+        self.started_at = time.time()
+        self._numeric = {col: _LiveSketch(spec["edges"]) for col, spec in reference["numeric"].items()} if reference else {}
+        self._subdivisions = {}
+        self._seasons = {}
+
+    def set_reference(self, reference):
+        """Use a new reference (e.g. after a model reload), discarding live sketches"""
+        with self._lock:
+            self._pending.clear()
+            self._reset(reference)
+
+    def observe(self, input_data):
+        """Queue one request input; the only work done on the request path"""
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append(input_data)
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        # Started lazily so that it runs in each forked worker
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            try:
+                self.drain()
+            except Exception as e:
+                print(f"Error updating drift sketches: {e}")
+
+    def drain(self):
+        """Fold queued inputs into the sketches"""
+        with self._lock:
+            if self.reference is None:
+                self._pending.clear()
+                return
+            subdivision_cols = self.reference["subdivision_columns"]
+            season_cols = self.reference["season_columns"]
+            while self._pending:
+                values = self._pending.popleft().dict()
+                self.observed += 1
+                for col, sketch in self._numeric.items():
+                    # Columns the input does not provide reach the model as 0
+                    value = values.get(col, 0)
+                    if value is not None:
+                        try:
+                            value = float(value)
+                        except (TypeError, ValueError):
+                            value = None
+                    sketch.add(value)
+                name = _category(values, subdivision_cols, "SUBDIVISION_")
+                self._subdivisions[name] = self._subdivisions.get(name, 0) + 1
+                name = _category(values, season_cols)
+                self._seasons[name] = self._seasons.get(name, 0) + 1
+
+    def report(self):
+        """Compare the live sketches with the reference; None if there is no reference"""
+        self.drain()
+        with self._lock:
+            reference = self.reference
+            if reference is None:
+                return None
+
+            features = {}
+            for col, spec in reference["numeric"].items():
+                sketch = self._numeric[col]
+                live_rows = sum(sketch.counts) + sketch.nulls
+                value = psi(spec["counts"], sketch.counts)
+                live_null_rate = sketch.nulls / live_rows if live_rows else None
+                # Values the imputer quietly fills in are drift too, even when
+                # no value is left to bin
+                null_drift = live_null_rate is not None and abs(live_null_rate - spec["null_rate"]) >= NULL_RATE_DRIFT
+                features[col] = {
+                    "psi": value,
+                    "status": "drift" if null_drift else _status(value),
+                    "null_rate": {
+                        "reference": spec["null_rate"],
+                        "live": live_null_rate,
+                        "drift": null_drift,
+                    },
+                    "quantiles": {
+                        "reference": spec["quantiles"],
+                        "live": {str(q): sketch.quantile(q) for q in REPORT_QUANTILES} if live_rows else {},
+                    },
+                }
+
+            categorical = {}
+            for name, expected, actual in (("subdivisions", reference["subdivisions"], self._subdivisions),
+                                           ("seasons", reference["seasons"], self._seasons)):
+                keys = sorted(set(expected) | set(actual))
+                value = psi([expected.get(k, 0) for k in keys], [actual.get(k, 0) for k in keys])
+                categorical[name] = {
+                    "psi": value,
+                    "status": _status(value),
+                    "reference": {k: expected.get(k, 0) for k in keys},
+                    "live": {k: actual.get(k, 0) for k in keys},
+                }
+
+            return {
+                "reference_rows": reference["rows"],
+                "live_rows": self.observed,
+                "dropped": self.dropped,
+                "since": self.started_at,
+                "drifted": [col for col, f in {**features, **categorical}.items() if f["status"] == "drift"],
+                "features": features,
+                **categorical,
+            }
@@ -2,50 +2,29 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-from sklearn.impute import SimpleImputer
 from app.models.prediction import PredictionInput
+from app.services.drift import build_reference
 from app.utils.data import load_dataset
 
 class MLModelService:
-    def __init__(self, model_path="./models/rainfall_pipeline_model.joblib"):
-        self.model_path = model_path
+    def __init__(self, model_path=None):
+        self.model_path = model_path or os.getenv("RAINFALL_MODEL_PATH", "./models/rainfall_pipeline_model.joblib")
         self.model = None
         self.scaler = None
         self.imputer = None
         self.feature_columns = None
         self.feature_importances = None
         self.regional_stats = None
+        self.drift_reference = None
         self.dataset = None
     
     def load_model(self):
         """Load the trained model or train a new one if it doesn't exist"""
         try:
-            # First, load the dataset for potential imputer fitting
-            self.dataset = load_dataset()
-            if self.dataset is None or self.dataset.empty:
-                raise Exception("Failed to load dataset or dataset is empty")
-            
+            # The dataset is only needed for training or refitting a missing
+            # imputer, so serving from a saved artifact never reads it
             if os.path.exists(self.model_path):
-                print(f"Loading model from {self.model_path}")
-                model_data = joblib.load(self.model_path)
-                self.model = model_data["model"]
-                self.scaler = model_data["scaler"]
-                self.feature_columns = model_data["feature_columns"]
-                self.feature_importances = model_data.get("feature_importances", None)
-                self.regional_stats = model_data.get("regional_stats", None)
-                
-                # Check if imputer exists in the saved model
-                if "imputer" in model_data and model_data["imputer"] is not None:
-                    self.imputer = model_data["imputer"]
-                    print("Loaded imputer from model file")
-                else:
-                    # Create and fit a new imputer if not in the saved model
-                    print("Imputer not found in model file. Creating and fitting a new one.")
-                    self._create_and_fit_imputer()
+                self.load_artifact()
             else:
                 print("Model not found. Training a new model...")
                 self.train_model()
@@ -61,8 +40,32 @@ class MLModelService:
                 traceback.print_exc()
                 raise
     
+    def load_artifact(self):
+        """Load the saved model artifact, loading the dataset only if the imputer must be refitted"""
+        print(f"Loading model from {self.model_path}")
+        model_data = joblib.load(self.model_path)
+        self.model = model_data["model"]
+        self.scaler = model_data["scaler"]
+        self.feature_columns = model_data["feature_columns"]
+        self.feature_importances = model_data.get("feature_importances", None)
+        self.regional_stats = model_data.get("regional_stats", None)
+        self.drift_reference = model_data.get("drift_reference", None)
+        
+        # Check if imputer exists in the saved model
+        if "imputer" in model_data and model_data["imputer"] is not None:
+            self.imputer = model_data["imputer"]
+            print("Loaded imputer from model file")
+        else:
+            # Create and fit a new imputer if not in the saved model
+            print("Imputer not found in model file. Creating and fitting a new one.")
+            if self.dataset is None or self.dataset.empty:
+                self.dataset = load_dataset()
+            self._create_and_fit_imputer()
+    
     def _create_and_fit_imputer(self):
         """Create and fit a new imputer using the loaded dataset"""
+        from sklearn.impute import SimpleImputer
+        
         try:
             if self.dataset is None or self.dataset.empty:
                 raise Exception("Dataset not available for fitting imputer")
@@ -82,6 +85,10 @@ class MLModelService:
     
     def train_model(self):
         """Train a new model using the dataset"""
+        # Training-only dependencies are imported lazily to keep API cold starts fast
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+        
         # Load the dataset if not already loaded
         if self.dataset is None or self.dataset.empty:
             self.dataset = load_dataset()
@@ -92,32 +99,14 @@ class MLModelService:
         # Calculate regional statistics for later use
         self.regional_stats = self._calculate_regional_stats(self.dataset)
         
-        # Prepare features and target
-        X = self.dataset.drop(["PredictedRainTomorrow"], axis=1, errors='ignore')
-        y = self.dataset["PredictedRainTomorrow"]
-        
-        # Store feature columns for prediction
-        self.feature_columns = X.columns.tolist()
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        # Create and fit imputer for handling missing values
-        self.imputer = SimpleImputer(strategy='mean')
-        X_train_imputed = self.imputer.fit_transform(X_train)
-        X_test_imputed = self.imputer.transform(X_test)
-        
-        # Scale features
-        self.scaler = StandardScaler()
-        X_train_scaled = self.scaler.fit_transform(X_train_imputed)
-        X_test_scaled = self.scaler.transform(X_test_imputed)
+        X_train_scaled, X_test_scaled, y_train, y_test = self.prepare_training_data()
         
         # Train model
         self.model = RandomForestClassifier(n_estimators=100, random_state=42)
         self.model.fit(X_train_scaled, y_train)
         
         # Store feature importances
-        self.feature_importances = dict(zip(X.columns, self.model.feature_importances_))
+        self.feature_importances = dict(zip(self.feature_columns, self.model.feature_importances_))
         
         # Evaluate model
         y_pred = self.model.predict(X_test_scaled)
@@ -133,16 +122,54 @@ class MLModelService:
         print(f"  F1 Score: {f1:.4f}")
         
         # Save model
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        self.save_model()
+    
+    def prepare_training_data(self):
+        """Split the dataset, fit the imputer and scaler, and return the scaled train/test split"""
+        from sklearn.impute import SimpleImputer
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        
+        # Prepare features and target
+        X = self.dataset.drop(["PredictedRainTomorrow"], axis=1, errors='ignore')
+        y = self.dataset["PredictedRainTomorrow"]
+        
+        # Store feature columns for prediction
+        self.feature_columns = X.columns.tolist()
+        
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        
+        # Summaries of the raw training inputs that live requests are compared against
+        self.drift_reference = build_reference(X_train, self.dataset.attrs.get("null_mask"))
+        
+        # Create and fit imputer for handling missing values
+        self.imputer = SimpleImputer(strategy='mean')
+        X_train_imputed = self.imputer.fit_transform(X_train)
+        X_test_imputed = self.imputer.transform(X_test)
+        
+        # Scale features
+        self.scaler = StandardScaler()
+        X_train_scaled = self.scaler.fit_transform(X_train_imputed)
+        X_test_scaled = self.scaler.transform(X_test_imputed)
+        
+        return X_train_scaled, X_test_scaled, y_train, y_test
+    
+    def save_model(self, path=None, **extra):
+        """Save the model artifact, with any extra entries, to path (default: model_path)"""
+        path = path or self.model_path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
         joblib.dump({
             "model": self.model,
             "scaler": self.scaler,
             "imputer": self.imputer,
             "feature_columns": self.feature_columns,
             "feature_importances": self.feature_importances,
-            "regional_stats": self.regional_stats
-        }, self.model_path)
-        print(f"Model saved to {self.model_path}")
+            "regional_stats": self.regional_stats,
+            "drift_reference": self.drift_reference,
+            **extra
+        }, path)
+        print(f"Model saved to {path}")
     
     def _calculate_regional_stats(self, df):
         """Calculate regional statistics from the dataset"""
@@ -167,11 +194,6 @@ class MLModelService:
     
     def preprocess_input(self, input_data: PredictionInput):
         """Convert input data to a format the model can use"""
-        # Ensure imputer is available
-        if self.imputer is None:
-            print("Imputer not available. Creating and fitting a new one.")
-            self._create_and_fit_imputer()
-        
         # Convert input to dictionary
         input_dict = input_data.dict()
         
@@ -182,31 +204,53 @@ class MLModelService:
         print("Input columns:", input_df.columns.tolist())
         print("Feature columns:", self.feature_columns)
         
-        # Ensure all feature columns are present
+        # Report feature columns the input does not provide
         for col in self.feature_columns:
             if col not in input_df.columns:
                 print(f"Adding missing column: {col}")
-                input_df[col] = 0
-        
-        # Select only the columns used during training and in the same order
-        input_df = input_df[self.feature_columns]
         
         # Check for NaN values before imputation
-        if input_df.isna().any().any():
+        present_df = input_df[[col for col in self.feature_columns if col in input_df.columns]]
+        if present_df.isna().any().any():
             print("Warning: NaN values detected in input data before imputation")
-            print("NaN columns:", input_df.columns[input_df.isna().any()].tolist())
+            print("NaN columns:", present_df.columns[present_df.isna().any()].tolist())
+        
+        return self.preprocess_frame(input_df)
+    
+    def preprocess_frame(self, input_df):
+        """Align, impute and scale a DataFrame of inputs for batched inference"""
+        # Ensure imputer is available
+        if self.imputer is None:
+            print("Imputer not available. Creating and fitting a new one.")
+            self._create_and_fit_imputer()
+        
+        # Select only the columns used during training and in the same order.
+        # Columns an input leaves out get the value PredictionInput would give
+        # them: None (imputed) for measurements, 0 for indicators and for
+        # columns PredictionInput does not have
+        missing = [i for i, col in enumerate(self.feature_columns) if col not in input_df.columns]
+        input_df = input_df.reindex(columns=self.feature_columns)
+        try:
+            input_array = input_df.to_numpy(dtype=float)
+        except (TypeError, ValueError):
+            # Text values (e.g. from uploaded files); only object columns need converting
+            object_cols = input_df.select_dtypes("object").columns
+            input_df[object_cols] = input_df[object_cols].apply(pd.to_numeric, errors='coerce')
+            input_array = input_df.to_numpy(dtype=float)
+        fields = PredictionInput.__fields__
+        for i in missing:
+            field = fields.get(self.feature_columns[i])
+            default = field.default if field is not None else 0
+            if default is not None:
+                input_array[:, i] = default
         
         # Fill missing values using the imputer
         try:
-            # Convert to numpy array without column names to avoid feature name mismatch
-            input_array = input_df.values
             input_imputed = self.imputer.transform(input_array)
         except Exception as e:
             print(f"Error during imputation: {e}")
             # Fallback: replace NaN with 0
-            input_df = input_df.fillna(0)
-            input_array = input_df.values
-            input_imputed = input_array
+            input_imputed = np.nan_to_num(input_array, nan=0.0)
         
         # Scale the features
         try:
@@ -233,6 +277,21 @@ class MLModelService:
         
         return prediction_proba
     
+    def predict_batch(self, features):
+        """Return the probability of rain for every row of a preprocessed batch"""
+        if self.model is None:
+            raise Exception("Model not loaded. Call load_model() first.")
+        
+        return self.model.predict_proba(features)[:, 1]
+    
+    def get_confidence(self, prediction):
+        """Map a rain probability to a Low/Medium/High confidence level"""
+        if prediction > 0.8 or prediction < 0.2:
+            return "High"
+        elif prediction > 0.65 or prediction < 0.35:
+            return "Medium"
+        return "Low"
+    
     def get_regional_info(self, subdivision):
         """Get regional information for a specific subdivision"""
         if self.regional_stats is None:
@@ -0,0 +1,176 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# Leaf frames of threads that are idle rather than doing request work
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _frame_label(code, cache={}):
+    """Flamegraph frame name: function (short path:first line)"""
+    label = cache.get(code)
+    if label is not None:
+        return label
+    path = code.co_filename
+    if "site-packages" + os.sep in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif path.startswith(APP_ROOT):
+        path = os.path.relpath(path, APP_ROOT)
+    else:
+        path = os.path.basename(path)
+    label = cache[code] = f"{code.co_name} ({path}:{code.co_firstlineno})"
+    return label
+
+
+class ProfileSession:
+    """One profiling window, bounded by a duration and/or a number of requests"""
+
+    def __init__(self, seconds, max_requests, path_prefix, interval, top_allocations):
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + seconds
+        self.max_requests = max_requests
+        self.path_prefix = path_prefix
+        self.interval = interval
+        self.top_allocations = top_allocations
+        self.in_flight = 0
+        self.completed_requests = 0
+        self.samples = 0
+        self.stacks = Counter()
+        self.done = threading.Event()
+        self.result = None
+
+    def request_started(self):
+        self.in_flight += 1
+
+    def request_finished(self):
+        self.in_flight -= 1
+        self.completed_requests += 1
+
+    def finished(self):
+        if self.max_requests is not None and self.completed_requests >= self.max_requests:
+            return True
+        return time.monotonic() >= self.deadline
+
+
+class RequestProfiler:
+    """
+    On-demand sampling CPU profiler and allocation tracer for the request path.
+
+    While no session is active nothing is sampled or traced; the middleware
+    only checks `session is None`. A session samples the stacks of all busy
+    threads while matching requests are in flight and traces allocations
+    with tracemalloc, then returns collapsed stacks and the top allocation
+    sites.
+    """
+
+    def __init__(self, interval=0.005, max_seconds=300):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.session = None
+        self._lock = threading.Lock()
+
+    def start(self, seconds=None, max_requests=None, path_prefix="/predict", top_allocations=25,
+              trace_allocations=True):
+        """Start a session; returns it, or None if one is already running"""
+        seconds = min(seconds or self.max_seconds, self.max_seconds)
+        with self._lock:
+            if self.session is not None:
+                return None
+            session = ProfileSession(seconds, max_requests, path_prefix, self.interval, top_allocations)
+            started_tracing = trace_allocations and not tracemalloc.is_tracing()
+            if started_tracing:
+                # One frame per trace is enough to attribute allocation sites
+                tracemalloc.start(1)
+            baseline = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+            self.session = session
+
+        thread = threading.Thread(
+            target=self._run, args=(session, baseline, started_tracing), name="request-profiler", daemon=True
+        )
+        thread.start()
+        return session
+
+    def _run(self, session, baseline, started_tracing):
+        own_id = threading.get_ident()
+        try:
+            while not session.finished():
+                time.sleep(session.interval)
+                if session.in_flight <= 0:
+                    continue
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    code = frame.f_code
+                    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    session.stacks[";".join(reversed(stack))] += 1
+                    session.samples += 1
+        finally:
+            with self._lock:
+                self.session = None
+            session.result = self._build_result(session, baseline)
+            if started_tracing:
+                tracemalloc.stop()
+            session.done.set()
+
+    def _build_result(self, session, baseline):
+        allocations = []
+        if baseline is not None:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "*/linecache.py"),
+            ])
+            for stat in snapshot.compare_to(baseline, "lineno")[:session.top_allocations]:
+                frame = stat.traceback[0]
+                allocations.append({
+                    "site": f"{frame.filename}:{frame.lineno}",
+                    "size_diff_kib": round(stat.size_diff / 1024, 1),
+                    "count_diff": stat.count_diff,
+                    "size_kib": round(stat.size / 1024, 1),
+                })
+
+        collapsed = "\n".join(f"{stack} {count}" for stack, count in session.stacks.most_common())
+        return {
+            "duration_seconds": round(time.monotonic() - session.started_at, 3),
+            "requests": session.completed_requests,
+            "samples": session.samples,
+            "sample_interval_ms": session.interval * 1000,
+            "collapsed_stacks": collapsed,
+            "top_allocations": allocations,
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that reports matching requests to an active profiling session"""
+
+    def __init__(self, app, profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        session = self.profiler.session
+        if session is None or scope["type"] != "http" or not scope["path"].startswith(session.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        session.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.request_finished()
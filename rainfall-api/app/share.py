@@ -0,0 +1,35 @@
+"""
+Publish the rainfall dataset and aggregates to the shared tables.
+
+Rebuilds the aggregates from the dataset and the observation store and
+writes a new version of the tables at RAINFALL_SHARED_TABLES_PATH (or
+--path). Running workers notice the new version on their next request and
+re-attach to it, so run this after replacing the dataset, or to fold
+ingested observations into the shared copy.
+
+Usage:
+    python -m app.share --path /dev/shm/raincast-tables
+"""
+import argparse
+import os
+import sys
+
+from app.services.aggregates import RainfallAggregates, get_ingest_store
+from app.utils.shared_tables import SharedTables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish a new version of the shared rainfall tables")
+    parser.add_argument("--path", default=os.getenv("RAINFALL_SHARED_TABLES_PATH"),
+                        help="Shared tables path (default: RAINFALL_SHARED_TABLES_PATH)")
+    args = parser.parse_args(argv)
+    if not args.path:
+        parser.error("set --path or RAINFALL_SHARED_TABLES_PATH")
+
+    aggregates = RainfallAggregates(get_ingest_store(), SharedTables(args.path))
+    aggregates.publish_shared()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import tempfile
+import pandas as pd
+from starlette.concurrency import run_in_threadpool
+
+CSV_MEDIA_TYPES = ("text/csv", "application/csv")
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines")
+# Uploads larger than this are spooled to a temporary file instead of memory
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+# Bytes read back from the spooled upload at a time
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def detect_format(media_type, default=None):
+    """Map a Content-Type/Accept value to "csv" or "ndjson" (or the default)"""
+    if not media_type:
+        return default
+    for value in media_type.split(","):
+        value = value.split(";")[0].strip().lower()
+        if value in CSV_MEDIA_TYPES:
+            return "csv"
+        if value in NDJSON_MEDIA_TYPES:
+            return "ndjson"
+    return default
+
+
+async def spool_body(byte_stream, max_size=SPOOL_MAX_BYTES):
+    """
+    Read a whole request body into a SpooledTemporaryFile, rewound for reading.
+
+    Responding only once the upload is complete keeps half-duplex clients
+    (urllib, requests, browser fetch), which read nothing until they have
+    sent the whole body, from deadlocking with the server on full socket buffers.
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=max_size)
+    async for chunk in byte_stream:
+        # Disk writes once the file has rolled over must not block the event loop
+        if body._rolled:
+            await run_in_threadpool(body.write, chunk)
+        else:
+            body.write(chunk)
+    body.seek(0)
+    return body
+
+
+async def iter_file(body, chunk_bytes=READ_CHUNK_BYTES):
+    """Async stream of byte chunks read from a spooled body"""
+    while True:
+        chunk = await run_in_threadpool(body.read, chunk_bytes)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def iter_lines(byte_stream):
+    """Split an async stream of byte chunks into complete text lines"""
+    pending = b""
+    async for chunk in byte_stream:
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8")
+    if pending.strip():
+        yield pending.rstrip(b"\r").decode("utf-8")
+
+
+async def iter_record_chunks(byte_stream, input_format, chunk_rows):
+    """
+    Parse an uploaded CSV or NDJSON body into DataFrames of at most chunk_rows rows.
+
+    Only one chunk of lines is buffered at a time, so memory stays bounded
+    regardless of the upload size. CSV fields must not contain embedded newlines.
+    """
+    header = None
+    lines = []
+    async for line in iter_lines(byte_stream):
+        if not line.strip():
+            continue
+        if input_format == "csv" and header is None:
+            header = line
+            continue
+        lines.append(line)
+        if len(lines) >= chunk_rows:
+            yield _parse_lines(lines, input_format, header)
+            lines = []
+    if lines:
+        yield _parse_lines(lines, input_format, header)
+
+
+def _parse_lines(lines, input_format, header):
+    if input_format == "csv":
+        return pd.read_csv(io.StringIO(header + "\n" + "\n".join(lines)))
+    return pd.DataFrame.from_records([json.loads(line) for line in lines])
+
+
+def format_predictions(first_row, predictions, confidences, output_format, include_header=False):
+    """Render a chunk of predictions as NDJSON lines or CSV rows"""
+    if output_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if include_header:
+            writer.writerow(["row", "prediction", "confidence"])
+        for offset, (prediction, confidence) in enumerate(zip(predictions, confidences)):
+            writer.writerow([first_row + offset, f"{prediction:.6f}", confidence])
+        return buffer.getvalue()
+
+    return "".join(
+        json.dumps({"row": first_row + offset, "prediction": float(prediction), "confidence": confidence}) + "\n"
+        for offset, (prediction, confidence) in enumerate(zip(predictions, confidences))
+    )
+
+
+def format_summary(summary, output_format):
+    """Render the end-of-stream progress and throughput summary"""
+    if output_format == "csv":
+        # Trailing comment line; readable with pandas.read_csv(..., comment="#")
+        return "# " + " ".join(f"{key}={value}" for key, value in summary.items()) + "\n"
+    return json.dumps({"summary": summary}) + "\n"
+
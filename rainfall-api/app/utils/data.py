@@ -1,12 +1,12 @@
-import json
 from pathlib import Path
 import pandas as pd
 import os
 import numpy as np
 import random
 
-def load_dataset(file_path="./data/rain_predictions1.csv"):
-    """Load the rainfall dataset"""
+def load_dataset(file_path=None):
+    """Load the rainfall dataset (RAINFALL_DATASET_PATH overrides the default location)"""
+    file_path = file_path or os.getenv("RAINFALL_DATASET_PATH", "./data/rain_predictions1.csv")
     try:
         if not os.path.exists(file_path):
             print(f"Dataset not found at {file_path}")
@@ -31,8 +31,10 @@ def load_dataset(file_path="./data/rain_predictions1.csv"):
         print(f"Dataset loaded with {df.shape[0]} rows and {df.shape[1]} columns")
         
         # Basic preprocessing
-        # Handle missing values
+        # Handle missing values, keeping where they were for drift monitoring
+        null_mask = df.isna()
         df = df.fillna(0)
+        df.attrs["null_mask"] = null_mask
         
         # Ensure all subdivision columns are properly formatted
         for col in df.columns:
@@ -230,201 +232,41 @@ def generate_synthetic_data():
     print(f"Generated synthetic dataset with {df.shape[0]} rows and {df.shape[1]} columns")
     return df
 
-def get_rainfall_statistics():
+def find_dataset_path():
     """
-    Get general rainfall statistics for India from the dataset.
-    Returns a dictionary with statistics or None if there was an error.
+    Locate rain_predictions1.csv, checking the app data directory first.
+    Returns a Path or None if the dataset could not be found.
     """
-    try:
-        # Determine base directory using __file__ or fallback to cwd
-        if "__file__" in globals():
-            base_dir = Path(__file__).resolve().parent.parent
-        else:
-            base_dir = Path(os.getcwd())
-
-        # Primary dataset path
-        dataset_path = base_dir / "data" / "rain_predictions1.csv"
-        print(f"Trying to load dataset from: {dataset_path}")
+    configured_path = os.getenv("RAINFALL_DATASET_PATH")
+    if configured_path and os.path.exists(configured_path):
+        return Path(configured_path)
 
-        # Check if the dataset exists
-        if not dataset_path.exists():
-            print(f"Dataset not found at: {dataset_path}")
-            # Try fallback paths
-            possible_paths = [
-                Path("data/rain_predictions1.csv"),
-                Path("../data/rain_predictions1.csv"),
-                Path("app/data/rain_predictions1.csv"),
-            ]
-            for path in possible_paths:
-                print(f"Checking fallback path: {path.resolve()}")
-                if path.exists():
-                    dataset_path = path
-                    print(f"Found dataset at: {dataset_path}")
-                    break
-            else:
-                print("Could not find dataset in any expected location.")
-                return None
-
-        # Load dataset
-        print(f"Loading dataset from: {dataset_path.resolve()}")
-        df = pd.read_csv(dataset_path)
+    # Determine base directory using __file__ or fallback to cwd
+    if "__file__" in globals():
+        base_dir = Path(__file__).resolve().parent.parent
+    else:
+        base_dir = Path(os.getcwd())
 
-        # Prepare statistics
-        stats = {
-            "total_records": len(df),
-            "time_period": {
-                "start_year": int(df["YEAR"].min()) if "YEAR" in df.columns else None,
-                "end_year": int(df["YEAR"].max()) if "YEAR" in df.columns else None,
-            },
-            "overall_stats": {
-                "mean_annual_rainfall": float(df["ANNUAL"].mean()) if "ANNUAL" in df.columns else None,
-                "max_annual_rainfall": float(df["ANNUAL"].max()) if "ANNUAL" in df.columns else None,
-                "min_annual_rainfall": float(df["ANNUAL"].min()) if "ANNUAL" in df.columns else None,
-                "std_annual_rainfall": float(df["ANNUAL"].std()) if "ANNUAL" in df.columns else None,
-            },
-            "subdivisions": df["SUBDIVISION"].unique().tolist() if "SUBDIVISION" in df.columns else [],
-        }
+    # Primary dataset path
+    dataset_path = base_dir / "data" / "rain_predictions1.csv"
+    print(f"Trying to load dataset from: {dataset_path}")
 
-        # Add seasonal stats if all monthly columns exist
-        months = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
-        if all(month in df.columns for month in months):
-            stats["seasonal_stats"] = {
-                "winter": float(df[["JAN", "FEB"]].sum(axis=1).mean()),
-                "pre_monsoon": float(df[["MAR", "APR", "MAY"]].sum(axis=1).mean()),
-                "monsoon": float(df[["JUN", "JUL", "AUG", "SEP"]].sum(axis=1).mean()),
-                "post_monsoon": float(df[["OCT", "NOV", "DEC"]].sum(axis=1).mean()),
-            }
+    # Check if the dataset exists
+    if dataset_path.exists():
+        return dataset_path
 
-        # Return as JSON serializable
-        return json.loads(json.dumps(stats, default=str))
+    print(f"Dataset not found at: {dataset_path}")
+    # Try fallback paths
+    possible_paths = [
+        Path("data/rain_predictions1.csv"),
+        Path("../data/rain_predictions1.csv"),
+        Path("app/data/rain_predictions1.csv"),
+    ]
+    for path in possible_paths:
+        print(f"Checking fallback path: {path.resolve()}")
+        if path.exists():
+            print(f"Found dataset at: {path}")
+            return path
 
-    except Exception as e:
-        print(f"Error calculating rainfall statistics: {str(e)}")
-        return None
-def get_regional_data(subdivision):
-    """Get regional data for a specific subdivision"""
-    df = load_dataset()
-    
-    if df is None or df.empty:
-        print("Dataset is empty or failed to load")
-        return None
-    
-    # Check if we're dealing with a column name in the format "SUBDIVISION_Kerala"
-    if subdivision.startswith("SUBDIVISION_"):
-        # Extract the actual subdivision name
-        col_name = subdivision
-        subdivision = subdivision.replace("SUBDIVISION_", "")
-        
-        # First try looking for the exact column
-        if col_name in df.columns:
-            print(f"Found column: {col_name}")
-            subdivision_data = df[df[col_name] == 1]
-        else:
-            print(f"Column {col_name} not found")
-            # Try to find a matching column
-            matching_cols = [col for col in df.columns if col.startswith("SUBDIVISION_") and subdivision in col]
-            if matching_cols:
-                print(f"Found matching column: {matching_cols[0]}")
-                subdivision_data = df[df[matching_cols[0]] == 1]
-            else:
-                print(f"No matching column found for {subdivision}")
-                return None
-    else:
-        # No prefix - first check if SUBDIVISION column exists
-        if "SUBDIVISION" in df.columns:
-            subdivision_data = df[df["SUBDIVISION"] == subdivision]
-            if not subdivision_data.empty:
-                print(f"Found data using SUBDIVISION column for {subdivision}")
-            else:
-                print(f"No data found in SUBDIVISION column for {subdivision}")
-        else:
-            # SUBDIVISION column doesn't exist, try one-hot columns
-            print("SUBDIVISION column not found, trying one-hot columns")
-            subdivision_data = pd.DataFrame()
-        
-        # If no data found or SUBDIVISION column doesn't exist, try finding the corresponding one-hot column
-        if subdivision_data.empty:
-            col_name = f"SUBDIVISION_{subdivision}"
-            if col_name in df.columns:
-                print(f"Using one-hot column: {col_name}")
-                subdivision_data = df[df[col_name] == 1]
-            else:
-                # Try to find a matching column
-                matching_cols = [col for col in df.columns if col.startswith("SUBDIVISION_") and subdivision in col]
-                if matching_cols:
-                    print(f"Found matching column: {matching_cols[0]}")
-                    subdivision_data = df[df[matching_cols[0]] == 1]
-                else:
-                    print(f"No matching column found for {subdivision}")
-                    return None
-    
-    if subdivision_data.empty:
-        print(f"No data found for subdivision: {subdivision}")
-        # Print available subdivisions for debugging
-        print(f"Available one-hot columns: {[col for col in df.columns if col.startswith('SUBDIVISION_')]}")
-        if "SUBDIVISION" in df.columns:
-            print(f"Available subdivisions: {df['SUBDIVISION'].unique().tolist()}")
-        return None
-    
-    print(f"Found {len(subdivision_data)} records for subdivision: {subdivision}")
-    
-    # Calculate monthly averages
-    monthly_averages = {}
-    for month in ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]:
-        if month in subdivision_data.columns:
-            monthly_averages[month] = float(subdivision_data[month].mean())
-    
-    # Determine seasonal pattern based on monthly averages
-    if monthly_averages:
-        max_month = max(monthly_averages, key=monthly_averages.get)
-        min_month = min(monthly_averages, key=monthly_averages.get)
-        
-        monsoon_months = ["JUN", "JUL", "AUG", "SEP"]
-        winter_months = ["DEC", "JAN", "FEB"]
-        
-        if max_month in monsoon_months:
-            seasonal_pattern = f"{subdivision} receives most of its rainfall during the Southwest Monsoon season (June-September), with peak rainfall in {max_month}."
-        elif max_month in ["OCT", "NOV"]:
-            seasonal_pattern = f"{subdivision} receives significant rainfall during the Northeast Monsoon (October-December), with peak rainfall in {max_month}."
-        else:
-            seasonal_pattern = f"{subdivision} has an unusual rainfall pattern with peak rainfall in {max_month}."
-    else:
-        seasonal_pattern = f"No monthly data available for {subdivision}."
-    
-    # Calculate additional statistics
-    annual_rainfall = float(subdivision_data['ANNUAL'].mean()) if 'ANNUAL' in subdivision_data.columns else 0
-    
-    # Calculate monsoon contribution percentage
-    monsoon_rainfall_pct = 0
-    if 'Jun_Sep' in subdivision_data.columns and annual_rainfall > 0:
-        monsoon_rainfall_pct = float((subdivision_data['Jun_Sep'].mean() / annual_rainfall) * 100)
-    
-    # Get rain probability
-    rain_probability = float(subdivision_data['PredictedRainTomorrow'].mean()) if 'PredictedRainTomorrow' in subdivision_data.columns else 0
-    
-    regional_data = {
-        'subdivision': subdivision,
-        'avg_annual_rainfall': annual_rainfall,
-        'monsoon_rainfall_pct': monsoon_rainfall_pct,
-        'rain_probability': rain_probability,
-        'monthly_averages': monthly_averages,
-        'seasonal_pattern': seasonal_pattern
-    }
-    
-    # Get historical data for the recent years
-    if 'YEAR' in subdivision_data.columns and 'ANNUAL' in subdivision_data.columns:
-        recent_years = subdivision_data['YEAR'].unique().tolist()
-        recent_years = [year for year in recent_years if 1901 <= year <= 2023]
-        historical_data = []
-        
-        for year in recent_years:
-            year_data = subdivision_data[subdivision_data['YEAR'] == year]
-            if not year_data.empty:
-                historical_data.append({
-                    'year': int(year),
-                    'annual_rainfall': float(year_data['ANNUAL'].iloc[0])
-                })
-        
-        regional_data['historical_data'] = historical_data
-    
-    return regional_data
+    print("Could not find dataset in any expected location.")
+    return None
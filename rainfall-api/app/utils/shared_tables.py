@@ -0,0 +1,149 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: tables can be attached but not published
+    fcntl = None
+
+CONTROL_MAGIC = b"RCTABLES"
+DATA_MAGIC = b"RCTBDATA"
+# Control file: magic followed by the current version
+CONTROL_FORMAT = "<8sQ"
+# Data file: magic and metadata length, then JSON metadata, then the arrays
+DATA_HEADER_FORMAT = "<8sQ"
+ALIGNMENT = 64
+
+
+class TablesView:
+    """One published version of the tables; arrays are read-only views of the mapped file"""
+
+    def __init__(self, version, arrays, info):
+        self.version = version
+        self.arrays = arrays
+        self.info = info
+
+
+class SharedTables:
+    """
+    Numeric tables shared between processes through memory-mapped files.
+
+    Each publish writes a new data file `<path>.<version>` and then bumps the
+    version in the small control file at `path`. Readers map the control file
+    once, so checking for a new version is a read from shared memory; when it
+    changes they map the new data file and get zero-copy NumPy views into it.
+    Superseded data files are unlinked, but stay valid for processes that
+    still have them mapped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._control = None
+
+    def _data_path(self, version):
+        return f"{self.path}.{version}"
+
+    def current_version(self):
+        """Version in the control file, or None if nothing has been published"""
+        if self._control is None:
+            try:
+                with open(self.path, "rb") as f:
+                    self._control = mmap.mmap(f.fileno(), struct.calcsize(CONTROL_FORMAT), access=mmap.ACCESS_READ)
+            except (FileNotFoundError, ValueError):
+                return None
+        magic, version = struct.unpack_from(CONTROL_FORMAT, self._control)
+        return version if magic == CONTROL_MAGIC else None
+
+    def attach(self):
+        """Map the current version and return a TablesView, or None if there is none"""
+        version = self.current_version()
+        if version is None:
+            return None
+        try:
+            with open(self._data_path(version), "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            # Superseded between reading the version and opening the file
+            return None
+
+        magic, meta_length = struct.unpack_from(DATA_HEADER_FORMAT, buffer)
+        if magic != DATA_MAGIC:
+            raise ValueError(f"{self._data_path(version)} is not a shared tables file")
+        start = struct.calcsize(DATA_HEADER_FORMAT)
+        meta = json.loads(buffer[start:start + meta_length])
+
+        arrays = {}
+        for name, spec in meta["arrays"].items():
+            count = int(np.prod(spec["shape"]))
+            arrays[name] = np.frombuffer(buffer, dtype=spec["dtype"], count=count,
+                                         offset=spec["offset"]).reshape(spec["shape"])
+        return TablesView(meta["version"], arrays, meta["info"])
+
+    def publish(self, arrays, info):
+        """Write a new version of the tables and make it current; returns the version"""
+        if fcntl is None:
+            raise OSError("Publishing shared tables needs fcntl, which is not available on this platform")
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # Serialize publishers; readers never take the lock
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            header = os.pread(fd, struct.calcsize(CONTROL_FORMAT), 0)
+            previous = 0
+            if len(header) == struct.calcsize(CONTROL_FORMAT):
+                magic, previous = struct.unpack(CONTROL_FORMAT, header)
+                if magic != CONTROL_MAGIC:
+                    previous = 0
+            version = previous + 1
+
+            self._write_data(self._data_path(version), version, arrays, info)
+            os.pwrite(fd, struct.pack(CONTROL_FORMAT, CONTROL_MAGIC, version), 0)
+
+            # Keep the previous version for readers that are attaching right now
+            for stale in glob.glob(glob.escape(self.path) + ".*"):
+                suffix = stale.rsplit(".", 1)[1]
+                if suffix.isdigit() and int(suffix) < previous:
+                    os.remove(stale)
+        finally:
+            os.close(fd)
+        return version
+
+    def _write_data(self, path, version, arrays, info):
+        arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+        specs = {name: {"dtype": array.dtype.str, "shape": list(array.shape)} for name, array in arrays.items()}
+
+        # Reserve room for the metadata, allowing up to 20 digits per offset
+        for spec in specs.values():
+            spec["offset"] = 0
+        placeholder = json.dumps({"version": version, "arrays": specs, "info": info}).encode()
+        offset = _align(struct.calcsize(DATA_HEADER_FORMAT) + len(placeholder) + 20 * len(specs))
+        for name, array in arrays.items():
+            specs[name]["offset"] = offset
+            offset = _align(offset + array.nbytes)
+        meta = json.dumps({"version": version, "arrays": specs, "info": info}).encode()
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(struct.pack(DATA_HEADER_FORMAT, DATA_MAGIC, len(meta)))
+            f.write(meta)
+            for name, array in arrays.items():
+                f.seek(specs[name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(offset)
+        os.replace(tmp_path, path)
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def get_shared_tables():
+    """Shared tables configured by RAINFALL_SHARED_TABLES_PATH, or None if sharing is disabled"""
+    path = os.getenv("RAINFALL_SHARED_TABLES_PATH")
+    return SharedTables(path) if path else None
@@ -0,0 +1,62 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into a single execution.
+
+    The first caller for a key runs the function; callers that arrive while
+    it is running wait for it and share its result (or exception). Per-key
+    counters record how many calls were collapsed.
+    """
+
+    def __init__(self, max_tracked_keys=1000):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._metrics = {}
+        self.max_tracked_keys = max_tracked_keys
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            # Bound the metrics table when keys come from user input
+            metrics_key = key if key in self._metrics or len(self._metrics) < self.max_tracked_keys else "_other"
+            metrics = self._metrics.setdefault(metrics_key, {"calls": 0, "executions": 0, "collapsed": 0})
+            metrics["calls"] += 1
+
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._in_flight[key] = call
+                metrics["executions"] += 1
+            else:
+                metrics["collapsed"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+        return call.result
+
+    def get_metrics(self):
+        """Per-key call, execution and collapsed counts"""
+        with self._lock:
+            return {str(key): dict(value) for key, value in self._metrics.items()}
@@ -0,0 +1,122 @@
+import io
+import os
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not locked across processes
+    fcntl = None
+
+# Observation columns that hold text rather than numbers
+TEXT_COLUMNS = {"SUBDIVISION"}
+
+
+class ObservationStore:
+    """
+    Append-only CSV file of ingested rainfall observations.
+
+    Writers append whole rows under an exclusive file lock. Readers remember
+    the byte offset they have consumed and only parse what was appended
+    after it, so catching up costs O(new rows).
+    """
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        self.default_columns = list(columns) if columns is not None else None
+
+    def exists(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def read_header(self):
+        """Return (columns, header_size_in_bytes), or (None, 0) if the store is empty"""
+        if not self.exists():
+            return None, 0
+        with open(self.path, "rb") as f:
+            line = f.readline()
+        if not line.endswith(b"\n"):
+            return None, 0
+        columns = line.decode("utf-8").rstrip("\r\n").split(",")
+        return columns, len(line)
+
+    def append(self, df):
+        """Append rows to the store, returning the number of rows written"""
+        if df.empty:
+            return 0
+
+        # Rows can never be removed from the store, so reject the whole batch
+        # before anything is written if a value is not a number
+        df = coerce_numeric(df)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.path, "a", newline="") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                columns, _ = self.read_header()
+                if columns is None:
+                    columns = self.default_columns or df.columns.tolist()
+                    f.write(",".join(columns) + "\n")
+
+                unknown = [col for col in df.columns if col not in columns]
+                if unknown:
+                    raise ValueError(f"Unknown columns for the observation store: {unknown}")
+
+                # A single write per batch keeps concurrent readers from
+                # seeing more than one partially written row
+                f.write(df.reindex(columns=columns).to_csv(header=False, index=False, lineterminator="\n"))
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return len(df)
+
+    def read_since(self, offset):
+        """
+        Read the complete rows appended after a byte offset.
+
+        Returns (DataFrame or None, new_offset). Pass offset 0 to read from
+        the beginning of the store.
+        """
+        columns, header_size = self.read_header()
+        if columns is None:
+            return None, offset
+        offset = max(offset, header_size)
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+
+        # Only consume complete lines; a row still being written is picked
+        # up by the next read
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return None, offset
+
+        df = pd.read_csv(io.BytesIO(data[:end]), header=None, names=columns)
+        return df, offset + end
+
+
+def coerce_numeric(df):
+    """Convert every non-text column to numbers; raises ValueError naming the columns that fail"""
+    converted = {}
+    invalid = []
+    for col in df.columns:
+        if col in TEXT_COLUMNS:
+            converted[col] = df[col]
+            continue
+        values = pd.to_numeric(df[col], errors="coerce")
+        if (values.isna() & df[col].notna()).any():
+            invalid.append(col)
+        converted[col] = values
+    if invalid:
+        raise ValueError(f"Non-numeric values in columns: {invalid}")
+    return pd.DataFrame(converted, index=df.index)
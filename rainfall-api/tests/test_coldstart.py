@@ -0,0 +1,17 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from app import coldstart
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_coldstart_within_budget(monkeypatch):
+    """The cold-start check passes with the default budget (needs a trained model artifact)"""
+    monkeypatch.chdir(API_DIR)
+    model_path = os.getenv("RAINFALL_MODEL_PATH", "./models/rainfall_pipeline_model.joblib")
+    if not os.path.exists(model_path):
+        pytest.skip(f"No model artifact at {model_path}")
+    assert coldstart.main(["--runs", "1"]) == 0